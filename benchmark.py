@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""utils.py のウィジェットのベンチマーク
+
+    python benchmark.py                             # すべて実行
+    python benchmark.py collapsible                 # 名前を指定して実行
+    python benchmark.py flow --json                 # 結果を JSON で出力
+    python benchmark.py flow --save baseline.json   # 結果をベースラインとして保存
+    python benchmark.py flow --compare baseline.json  # ベースラインと比較
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from utils import QtWidgets, QtCore, CollapsibleFrame, ColorLabel, FloatSlider, FlowLayout, StaticText
+
+
+# ---------------------------------------------------------------------------------- #
+# COMMON
+# ---------------------------------------------------------------------------------- #
+def get_app():
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication(sys.argv[:1])
+    return app
+
+def measure(func, *args):
+    """関数の実行時間 (ミリ秒) と戻り値を返す"""
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000.0, result
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def summarize(result, name, samples):
+    """複数回の計測結果を中央値 (name) とばらつき (name_spread = 最大 - 最小) として記録"""
+    result[name] = round(median(samples), 2)
+    result[name + "_spread"] = round(max(samples) - min(samples), 2)
+
+def rss_kb():
+    """プロセスの常駐メモリ (KB)。/proc が無い環境では None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (IOError, OSError, ValueError):
+        return None
+
+# ---------------------------------------------------------------------------------- #
+# BENCHMARKS
+# ---------------------------------------------------------------------------------- #
+def bench_collapsible(count=500, repeat=5):
+    """CollapsibleFrame の生成時間と、表示時のポリッシュ・レイアウト・描画の時間
+    ウィンドウを作り直して repeat 回計測し、中央値とばらつきを返す
+    """
+    app = get_app()
+    styles = [CollapsibleFrame.kDefault, CollapsibleFrame.kSolid, CollapsibleFrame.kRounded, CollapsibleFrame.kDashed]
+    samples = {"construct_ms": [], "polish_ms": [], "restyle_ms": []}
+    
+    for _ in range(repeat):
+        window = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(window)
+        
+        def construct():
+            frames = []
+            for i in range(count):
+                frame = CollapsibleFrame("Frame {}".format(i))
+                frame.setFrameStyle(styles[i % len(styles)])
+                frame.addWidget(QtWidgets.QLabel("content"))
+                layout.addWidget(frame)
+                frames.append(frame)
+            return frames
+        
+        def polish():
+            window.show()
+            app.processEvents()
+        
+        def restyle(frames):
+            for i, frame in enumerate(frames):
+                frame.setFrameStyle(styles[(i + 1) % len(styles)])
+            app.processEvents()
+        
+        construct_ms, frames = measure(construct)
+        polish_ms, _ = measure(polish)
+        restyle_ms, _ = measure(restyle, frames)
+        samples["construct_ms"].append(construct_ms)
+        samples["polish_ms"].append(polish_ms)
+        samples["restyle_ms"].append(restyle_ms)
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+    
+    result = {"count": count, "repeat": repeat}
+    for name, values in samples.items():
+        summarize(result, name, values)
+    return result
+
+def bench_labels(count=1000, repaints=20):
+    """ColorLabel の描画回数/秒 (QStaticText のキャッシュあり・なし)"""
+    app = get_app()
+    window = QtWidgets.QWidget()
+    layout = QtWidgets.QGridLayout(window)
+    columns = 20
+    for i in range(count):
+        layout.addWidget(ColorLabel("Label {}".format(i)), i // columns, i % columns)
+    window.resize(columns * 90, (count // columns + 1) * 20)
+    window.show()
+    app.processEvents()
+
+    def paint():
+        for _ in range(repaints):
+            window.repaint()
+
+    result = {"count": count}
+    for name, enabled in (("cached", True), ("uncached", False)):
+        StaticText.enabled = enabled
+        paint()  # ウォームアップ
+        elapsed_ms, _ = measure(paint)
+        result["{}_paints_per_sec".format(name)] = int(count * repaints / (elapsed_ms / 1000.0))
+    StaticText.enabled = True
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return result
+
+class _CallCounter(object):
+    """クラスのメソッドを差し替えて呼び出し回数を数える (Qt からの仮想関数呼び出しも数えられる)"""
+    def __init__(self, cls, name):
+        self.cls = cls
+        self.name = name
+        self.count = 0
+        self._original = getattr(cls, name)
+
+    def __enter__(self):
+        original = self._original
+        def counted(*args):
+            self.count += 1
+            return original(*args)
+        setattr(self.cls, self.name, counted)
+        return self
+
+    def __exit__(self, *args):
+        setattr(self.cls, self.name, self._original)
+
+def _flow_sizes(count, kind):
+    """uniform は ShelfButton と同じ 32x32、mixed は幅と高さの異なるアイテムを混ぜる"""
+    if kind == "uniform":
+        return [(32, 32)] * count
+    variants = [(32, 32), (32, 32), (64, 32), (24, 24), (120, 20), (48, 40)]
+    return [variants[i % len(variants)] for i in range(count)]
+
+def bench_flow(counts=(100, 1000, 10000), kinds=("uniform", "mixed"), sweep=range(200, 1400, 10)):
+    """FlowLayout の配置時間、リサイズ中の heightForWidth の回数、最初の描画までの時間、メモリの最大値
+
+    - layout_ms:        キャッシュを捨てた状態からの _do_layout 1 回 (5 回の中央値)
+    - sweep_ms:         幅を sweep の順に変えながら表示を更新した合計時間
+    - height_for_width: sweep 中に呼ばれた heightForWidth の回数
+    - geometry_passes:  sweep 中に行の折り返しを計算し直した回数
+    - first_paint_ms:   ウィジェットの生成から最初の描画まで (描画されなかった場合は None)
+    - py_peak_kb:       生成から最初の描画までの Python のメモリ使用量の最大値 (tracemalloc)
+    - rss_kb:           生成から最初の描画までの常駐メモリの増加量 (Qt 側の確保を含む、/proc がある環境のみ)
+    """
+    app = get_app()
+    results = {}
+    for kind in kinds:
+        for count in counts:
+            rss = rss_kb()
+            tracemalloc.start()
+            start = time.perf_counter()
+            
+            window = QtWidgets.QScrollArea()
+            window.setWidgetResizable(True)
+            contents = QtWidgets.QWidget()
+            layout = FlowLayout(contents)
+            widgets = []
+            for width, height in _flow_sizes(count, kind):
+                widget = QtWidgets.QWidget()
+                widget.setFixedSize(width, height)
+                widgets.append(widget)
+            layout.addWidgets(widgets)
+            window.setWidget(contents)
+            window.resize(sweep[0], 400)
+            
+            painted = []
+            class PaintFilter(QtCore.QObject):
+                def eventFilter(self, obj, event):
+                    if event.type() == QtCore.QEvent.Paint and not painted:
+                        painted.append(time.perf_counter())
+                    return False
+            paint_filter = PaintFilter()
+            contents.installEventFilter(paint_filter)
+            window.show()
+            deadline = time.perf_counter() + 30.0
+            while not painted and time.perf_counter() < deadline:
+                app.processEvents()
+            # 描画されなかった場合は NaN ではなく None にする (JSON に NaN は書けない)
+            first_paint_ms = round((painted[0] - start) * 1000.0, 2) if painted else None
+            py_peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+            rss_growth_kb = rss_kb() - rss if rss is not None else None
+            
+            rect = layout.geometry()
+            samples = []
+            for _ in range(5):
+                layout._layout_cache.clear()
+                layout._applied_geometry = None
+                samples.append(measure(layout._do_layout, rect)[0])
+            
+            def resize_sweep():
+                for width in sweep:
+                    window.resize(width, 400)
+                    app.processEvents()
+            
+            with _CallCounter(FlowLayout, "heightForWidth") as height_for_width, \
+                    _CallCounter(FlowLayout, "_computeGeometry") as geometry_passes:
+                sweep_ms, _ = measure(resize_sweep)
+            
+            result = results["{}_{}".format(kind, count)] = {
+                "layout_ms": round(median(samples), 3),
+                "sweep_ms": round(sweep_ms, 2),
+                "height_for_width": height_for_width.count,
+                "geometry_passes": geometry_passes.count,
+                "first_paint_ms": first_paint_ms,
+                "py_peak_kb": py_peak_kb,
+            }
+            if rss_growth_kb is not None:
+                result["rss_kb"] = rss_growth_kb
+            contents.removeEventFilter(paint_filter)
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+    return results
+
+def bench_sliders(count=1000):
+    """FloatSlider の 1 つあたりの生成時間とメモリ
+
+    - construct_ms:         count 個の生成とレイアウトへの追加
+    - us_per_slider:        1 つあたりの生成時間 (マイクロ秒)
+    - widgets_per_slider:   1 つあたりに生成される QWidget の数
+    - py_bytes_per_slider:  1 つあたりの Python のメモリ使用量 (tracemalloc)
+    - rss_kb_per_slider:    1 つあたりの常駐メモリの増加量 (Qt 側の確保を含む、/proc がある環境のみ)
+    """
+    app = get_app()
+    window = QtWidgets.QWidget()
+    layout = QtWidgets.QVBoxLayout(window)
+    app.processEvents()
+    
+    def construct():
+        sliders = [FloatSlider() for _ in range(count)]
+        for slider in sliders:
+            layout.addWidget(slider)
+        return sliders
+    
+    widgets = len(QtWidgets.QApplication.allWidgets())
+    rss = rss_kb()
+    construct_ms, sliders = measure(construct)
+    result = {
+        "count": count,
+        "construct_ms": round(construct_ms, 2),
+        "us_per_slider": round(construct_ms * 1000.0 / count, 1),
+        "widgets_per_slider": round((len(QtWidgets.QApplication.allWidgets()) - widgets) / float(count), 2),
+    }
+    if rss is not None:
+        result["rss_kb_per_slider"] = round((rss_kb() - rss) / float(count), 2)
+    
+    # tracemalloc は生成を遅くするので時間とは別に測る
+    tracemalloc.start()
+    sliders += construct()
+    result["py_bytes_per_slider"] = tracemalloc.get_traced_memory()[0] // count
+    tracemalloc.stop()
+    
+    window.deleteLater()
+    app.processEvents()
+    return result
+
+BENCHMARKS = {
+    "collapsible": bench_collapsible,
+    "flow": bench_flow,
+    "labels": bench_labels,
+    "sliders": bench_sliders,
+}
+
+# ---------------------------------------------------------------------------------- #
+# REPORT
+# ---------------------------------------------------------------------------------- #
+def flatten(results, prefix=""):
+    """入れ子の結果を {"flow.uniform_100.layout_ms": 値} の形にする"""
+    flat = {}
+    for key, value in results.items():
+        name = "{}.{}".format(prefix, key) if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+def compare(results, baseline, tolerance=None):
+    """ベースラインとの比較を表示
+
+    Args:
+        results (dict): 今回の結果
+        baseline (dict): 保存しておいた結果
+        tolerance (float): 時間 (_ms) がこの割合以上遅くなった項目があれば失敗とする
+
+    Returns:
+        list: 許容範囲を超えて遅くなった項目
+    """
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    print("{:<48}{:>14}{:>14}{:>10}".format("metric", "baseline", "current", "change"))
+    for name in sorted(current):
+        value = current[name]
+        if name not in previous:
+            print("{:<48}{:>14}{:>14}{:>10}".format(name, "-", str(value), "new"))
+            continue
+        old = previous[name]
+        if value is None or old is None or value != value or old != old:
+            # 計測できなかった項目 (描画されなかったなど、古いベースラインの NaN を含む) は比較しない
+            print("{:<48}{:>14}{:>14}{:>10}".format(name, str(old), str(value), "-"))
+            continue
+        change = "{:+.1f}%".format((value - old) * 100.0 / old) if old else "-"
+        print("{:<48}{:>14}{:>14}{:>10}".format(name, old, value, change))
+        if tolerance is not None and name.endswith("_ms") and old and (value - old) / float(old) > tolerance:
+            regressions.append(name)
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="utils.py のウィジェットのベンチマーク")
+    parser.add_argument("names", nargs="*", help="実行するベンチマーク {} (省略時はすべて)".format(", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力")
+    parser.add_argument("--save", metavar="FILE", help="結果を JSON で保存")
+    parser.add_argument("--compare", metavar="FILE", help="保存した結果と比較")
+    parser.add_argument("--tolerance", type=float, default=None, help="時間がこの割合 (0.1 = 10%%) 以上遅くなったら終了コード 1")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmark: {}".format(", ".join(unknown)))
+    
+    results = {}
+    for name in args.names or sorted(BENCHMARKS):
+        results[name] = BENCHMARKS[name]()
+        if not args.json and not args.compare:
+            flat = flatten(results[name])
+            print("{:<16}{}".format(name, "  ".join("{}={}".format(key, value) for key, value in sorted(flat.items()))))
+    
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        baseline = dict((name, baseline[name]) for name in results if name in baseline)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""CollapsibleFrame の開閉を連打しても 1 回あたりのコストが増えないことの確認"""
+import time
+
+import pytest
+
+from utils import QtCore, QtWidgets, CollapsibleFrame
+
+TOGGLES = 10000
+WINDOW = 1000
+
+
+def animation_receivers(frame):
+    animation = frame.frame_animation
+    return (animation.receivers(QtCore.SIGNAL("valueChanged(QVariant)")),
+            animation.receivers(QtCore.SIGNAL("finished()")))
+
+
+def animation_objects(frame):
+    return len(frame.findChildren(QtCore.QAbstractAnimation))
+
+
+@pytest.fixture
+def frame(qapp):
+    frame = CollapsibleFrame("Storm")
+    for i in range(5):
+        frame.addWidget(QtWidgets.QLabel("content {}".format(i)))
+    frame.resize(200, 200)
+    frame.show()
+    qapp.processEvents()
+    yield frame
+    frame.close()
+    frame.deleteLater()
+    qapp.processEvents()
+
+
+@pytest.mark.parametrize("animated", [True, False])
+def test_toggle_storm(qapp, frame, animated):
+    frame.setAnimationEnabled(animated)
+    frame._toggle()
+    qapp.processEvents()
+    receivers = animation_receivers(frame)
+    objects = animation_objects(frame)
+    
+    durations = []
+    for i in range(TOGGLES):
+        start = time.perf_counter()
+        frame._toggle()
+        durations.append(time.perf_counter() - start)
+        if i % 100 == 0:
+            # 時々イベントを処理してアニメーションを進める
+            qapp.processEvents()
+    qapp.processEvents()
+    
+    # シグナルの接続もアニメーションも増えない
+    assert animation_receivers(frame) == receivers
+    assert animation_objects(frame) == objects
+    
+    # 最後の 1,000 回が最初の 1,000 回より極端に遅くならない (ばらつきを見込んで 2 倍まで許容)
+    first = sum(durations[:WINDOW])
+    last = sum(durations[-WINDOW:])
+    assert last < first * 2.0 + 0.01, (first, last)
+    
+    # 偶数回の切り替えで元の状態に戻る
+    assert frame.isCollapsed() == ((TOGGLES + 1) % 2 == 1)
+
+
+class CountingWidget(QtWidgets.QWidget):
+    """minimumSizeHint が呼ばれた回数を数える、レイアウトを持つウィジェット"""
+    def __init__(self):
+        super(CountingWidget, self).__init__()
+        self.calls = 0
+        QtWidgets.QVBoxLayout(self).addWidget(QtWidgets.QLabel("row"))
+
+    def minimumSizeHint(self):
+        self.calls += 1
+        return super(CountingWidget, self).minimumSizeHint()
+
+
+def test_content_height_measures_only_notified_children(qapp):
+    frame = CollapsibleFrame("Contents")
+    children = [CountingWidget() for _ in range(20)]
+    for child in children:
+        frame.addWidget(child)
+    frame.show()
+    qapp.processEvents()
+    before = frame._getContentHeight()
+    for child in children:
+        child.calls = 0
+
+    # 子のレイアウトにウィジェットを足すと、その子にだけ LayoutRequest が届く
+    label = QtWidgets.QLabel("added")
+    children[3].layout().addWidget(label)
+    qapp.processEvents()
+    after = frame._getContentHeight()
+
+    assert [index for index, child in enumerate(children) if child.calls] == [3]
+    assert after == before + children[3].minimumSizeHint().height() - children[4].minimumSizeHint().height()
+    
+    # 追加したウィジェットは次の計測で加わり、削除したウィジェットは取り除かれる
+    extra = QtWidgets.QLabel("extra")
+    frame.addWidget(extra)
+    assert frame._getContentHeight() == after + extra.minimumSizeHint().height() + 5
+    extra.setParent(None)
+    assert frame._getContentHeight() == after
+    frame.deleteLater()
+    qapp.processEvents()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""CollapsibleFrameGroup の一括操作の通知と、破棄されたフレームの扱いの確認"""
+import pytest
+
+from utils import QtCore, QtWidgets, CollapsibleFrame, CollapsibleFrameGroup
+
+
+@pytest.fixture
+def host(qapp):
+    host = QtWidgets.QWidget()
+    QtWidgets.QVBoxLayout(host)
+    yield host
+    host.close()
+    host.deleteLater()
+    qapp.processEvents()
+
+
+def make_group(qapp, host, count=5):
+    group = CollapsibleFrameGroup(host)
+    frames = []
+    for i in range(count):
+        frame = CollapsibleFrame("frame {}".format(i))
+        frame.addWidget(QtWidgets.QLabel("content {}".format(i)))
+        host.layout().addWidget(frame)
+        group.addFrame(frame)
+        frames.append(frame)
+    host.show()
+    qapp.processEvents()
+    return group, frames
+
+
+def record(group, frames):
+    """グループとフレームの toggled を記録するリストを返す"""
+    group_emits, frame_emits = [], []
+    group.toggled.connect(group_emits.append)
+    for frame in frames:
+        frame.toggled.connect(frame_emits.append)
+    return group_emits, frame_emits
+
+
+@pytest.mark.parametrize("animated", [False, True])
+def test_batch_emits_once(qapp, host, animated):
+    group, frames = make_group(qapp, host)
+    group.setAnimationEnabled(animated)
+    group_emits, frame_emits = record(group, frames)
+
+    group.collapseAll()
+    group._finishAnimation()
+    assert group_emits == [[0, 1, 2, 3, 4]]
+    assert frame_emits == []
+    assert [frame.isCollapsed() for frame in frames] == [True] * 5
+
+    # 排他モードの展開も一回の通知にまとめる (変わらないフレームは含めない)
+    group.setExclusive(True)
+    group.expand(2)
+    group._finishAnimation()
+    assert group_emits[1:] == [[2]]
+    assert [frame.isCollapsed() for frame in frames] == [True, True, False, True, True]
+
+    group.restoreState({"0": False, "2": True, "4": True})
+    group._finishAnimation()
+    assert sorted(group_emits[2]) == [0, 2]
+    assert frame_emits == []
+    assert [frame.isCollapsed() for frame in frames] == [False, True, True, True, True]
+
+
+def test_exclusive_click_collapses_others(qapp, host):
+    group, frames = make_group(qapp, host)
+    group.collapseAll()
+    group.setExclusive(True)
+    group_emits, frame_emits = record(group, frames)
+
+    # フレーム自身の操作による展開は、そのフレームの toggled と、ほかを折りたたむ一回の通知になる
+    frames[3].setCollapsed(False)
+    frames[1].setCollapsed(False)
+    assert frame_emits == [False, False]
+    assert group_emits == [[3]]
+    assert [frame.isCollapsed() for frame in frames] == [True, False, True, True, True]
+
+
+def test_destroyed_frame_leaves_group(qapp, host):
+    group, frames = make_group(qapp, host)
+    group.setAnimationEnabled(True)
+    group.collapseAll()
+    frames[1].deleteLater()
+    qapp.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+    assert group.count() == 4
+    assert group.frames() == [frames[0]] + frames[2:]
+    group._finishAnimation()
+    group.expandAll()
+    group._finishAnimation()
+    assert [frame.isCollapsed() for frame in group.frames()] == [False] * 4
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""CollapsibleSectionView の開閉とスクロールで、表示領域内の行に正しい位置のフレームが割り当たることの確認"""
+import random
+
+import pytest
+
+from utils import QtCore, QtWidgets, CollapsibleSectionView, _SectionOffsets
+
+ROWS = 5000
+STEPS = 300
+
+
+def reference_offsets(view):
+    """各行の上端の位置を先頭から計算した (offsets, 全体の高さ)"""
+    offsets = []
+    offset = 0
+    for row in range(len(view._collapsed)):
+        offsets.append(offset)
+        offset += view._sectionHeight(row) + view.spacing()
+    return offsets, offset
+
+
+def check_view(view, model):
+    offsets, total = reference_offsets(view)
+    assert view._offsets.total() == total
+    assert view.verticalScrollBar().maximum() == max(0, total - view.viewport().height())
+
+    top = view.verticalScrollBar().value()
+    bottom = top + view.viewport().height()
+    expected = [row for row, offset in enumerate(offsets)
+                if offset < bottom and offset + view._sectionHeight(row) + view.spacing() > top]
+    assert sorted(view._visible_frames) == expected
+    for row, frame in view._visible_frames.items():
+        assert frame.title() == model.data(model.index(row, 0))
+        assert frame.isCollapsed() == view.isSectionCollapsed(row)
+        assert frame.geometry() == QtCore.QRect(0, offsets[row] - top, view.viewport().width(), view._sectionHeight(row))
+        assert view.sectionRect(row) == frame.geometry()
+
+
+@pytest.fixture
+def view(qapp):
+    view = CollapsibleSectionView()
+    view.resize(300, 400)
+    yield view
+    view.close()
+    view.deleteLater()
+    qapp.processEvents()
+
+
+def test_section_offsets_match_prefix_sums():
+    rng = random.Random(5)
+    heights = [rng.choice([15, 20, 120]) for _ in range(1000)]
+    offsets = _SectionOffsets(heights)
+    for _ in range(500):
+        row = rng.randrange(len(heights))
+        delta = rng.choice([-5, 5, 100]) if heights[row] > 5 else 5
+        heights[row] += delta
+        offsets.add(row, delta)
+        probe = rng.randrange(len(heights) + 1)
+        assert offsets.offset(probe) == sum(heights[:probe])
+        y = rng.randrange(sum(heights) + 50)
+        expected = max(index for index in range(len(heights) + 1) if sum(heights[:index]) <= y)
+        assert offsets.rowAt(y) == expected
+    assert offsets.total() == sum(heights)
+
+
+def test_scroll_and_toggle_large_model(qapp, view):
+    rng = random.Random(7)
+    model = QtCore.QStringListModel(["section {}".format(row) for row in range(ROWS)])
+    view.setSpacing(2)
+    view.setModel(model)
+    view.show()
+    qapp.processEvents()
+    scroll_bar = view.verticalScrollBar()
+    check_view(view, model)
+
+    for step in range(STEPS):
+        operation = rng.random()
+        if operation < 0.4:
+            scroll_bar.setValue(rng.randrange(scroll_bar.maximum() + 1))
+        elif operation < 0.7:
+            row = rng.randrange(ROWS)
+            view.setSectionCollapsed(row, not view.isSectionCollapsed(row))
+        elif operation < 0.9 and view._visible_frames:
+            # 表示中のフレームをユーザーが開閉した場合
+            row = rng.choice(sorted(view._visible_frames))
+            view._visible_frames[row].setCollapsed(not view.isSectionCollapsed(row))
+        else:
+            scroll_bar.setValue(scroll_bar.maximum() if operation < 0.95 else 0)
+        check_view(view, model)
+
+
+def test_data_and_row_changes_keep_offsets(qapp, view):
+    model = QtCore.QStringListModel(["section {}".format(row) for row in range(200)])
+    view.setModel(model)
+    view.show()
+    view.setSectionCollapsed(3, True)
+    view.scrollToSection(5)
+    check_view(view, model)
+
+    model.setData(model.index(6, 0), "renamed")
+    check_view(view, model)
+    model.insertRows(2, 3)
+    check_view(view, model)
+    model.removeRows(0, 4)
+    check_view(view, model)
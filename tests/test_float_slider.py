@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""FloatSlider のドラッグ中の送出方法・描画済みレイヤー・共有のエディタの確認"""
+import pytest
+
+from utils import QtCore, QtGui, QtWidgets, FloatSlider, FloatSymbolSlider
+
+
+def send_mouse(widget, event_type, x, button=QtCore.Qt.LeftButton):
+    """ウィジェットにマウスイベントを送る (移動中は左ボタンを押したまま)"""
+    pos = QtCore.QPointF(x, widget.height() / 2.0)
+    buttons = QtCore.Qt.NoButton if event_type == QtCore.QEvent.MouseButtonRelease else QtCore.Qt.LeftButton
+    event_button = QtCore.Qt.NoButton if event_type == QtCore.QEvent.MouseMove else button
+    event = QtGui.QMouseEvent(event_type, pos, widget.mapToGlobal(pos), event_button, buttons, QtCore.Qt.NoModifier)
+    QtCore.QCoreApplication.sendEvent(widget, event)
+
+
+def drag(widget, positions, release=True):
+    send_mouse(widget, QtCore.QEvent.MouseButtonPress, positions[0])
+    for x in positions:
+        send_mouse(widget, QtCore.QEvent.MouseMove, x)
+    if release:
+        send_mouse(widget, QtCore.QEvent.MouseButtonRelease, positions[-1])
+
+
+def wait(milliseconds):
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec()
+
+
+@pytest.fixture
+def slider(qapp):
+    slider = FloatSlider()
+    slider.resize(200, 20)
+    slider.setSingleStep(0.001)
+    slider.show()
+    qapp.processEvents()
+    yield slider
+    slider.close()
+    slider.deleteLater()
+    qapp.processEvents()
+
+
+def record(slider):
+    moved, changed = [], []
+    slider.sliderMoved.connect(moved.append)
+    slider.valueChanged.connect(changed.append)
+    return moved, changed
+
+
+POSITIONS = list(range(10, 190, 9))
+
+
+def test_every_move_emits_each_value(qapp, slider):
+    moved, changed = record(slider)
+    drag(slider, POSITIONS)
+    assert len(moved) == len(POSITIONS)
+    assert (slider.deliveredCount(), slider.droppedCount()) == (len(POSITIONS), 0)
+    assert changed == [moved[-1]]
+
+
+def test_interval_keeps_latest_and_flushes_on_release(qapp, slider):
+    slider.setEmissionPolicy(FloatSlider.kEmitInterval, interval=10000)
+    moved, changed = record(slider)
+    drag(slider, POSITIONS, release=False)
+    # 間隔の途中なので送出せず、最新の値だけを保留している
+    assert moved == []
+    assert slider.droppedCount() == len(POSITIONS) - 1
+
+    send_mouse(slider, QtCore.QEvent.MouseButtonRelease, POSITIONS[-1])
+    assert moved == [slider.value()]
+    assert changed == [slider.value()]
+    assert (slider.deliveredCount(), slider.droppedCount()) == (1, len(POSITIONS) - 1)
+
+
+def test_leading_emits_first_and_last(qapp, slider):
+    slider.setEmissionPolicy(FloatSlider.kEmitInterval, interval=10000, leading=True, trailing=False)
+    moved, changed = record(slider)
+    drag(slider, POSITIONS, release=False)
+    assert len(moved) == 1
+    send_mouse(slider, QtCore.QEvent.MouseButtonRelease, POSITIONS[-1])
+    assert len(moved) == 2 and moved[-1] == slider.value()
+    assert slider.deliveredCount() + slider.droppedCount() == len(POSITIONS)
+
+
+def test_trailing_emits_when_interval_ends(qapp, slider):
+    slider.setEmissionPolicy(FloatSlider.kEmitInterval, interval=5)
+    moved, changed = record(slider)
+    drag(slider, POSITIONS[:3], release=False)
+    assert moved == []
+    wait(50)
+    # 間隔の終わりに最新の値を送出し、それ以降は保留が無いので送出しない
+    assert moved == [slider.value()]
+    send_mouse(slider, QtCore.QEvent.MouseButtonRelease, POSITIONS[2])
+    assert moved == [slider.value()]
+    assert changed == [slider.value()]
+    assert (slider.deliveredCount(), slider.droppedCount()) == (1, 2)
+
+
+def layer_keys():
+    return list(FloatSlider._layer_cache)
+
+
+def test_layers_are_shared_and_reused(qapp):
+    # 表示していないスライダーはホバーの状態にならない
+    FloatSlider._layer_cache.clear()
+    slider = FloatSlider()
+    slider.resize(200, 20)
+    slider.setValue(0.5)
+    image = slider.grab().toImage()
+    keys = layer_keys()
+    # 背景とスライダーの 2 枚
+    assert len(keys) == 2
+    pixmaps = [FloatSlider._layer_cache[key].cacheKey() for key in keys]
+
+    # 同じ見た目のスライダーや再描画では描き直さない
+    other = FloatSlider()
+    other.resize(slider.size())
+    other.setValue(0.25)
+    other.grab()
+    slider.setValue(0.75)
+    slider.grab()
+    assert sorted(layer_keys()) == sorted(keys)
+    assert [FloatSlider._layer_cache[key].cacheKey() for key in keys] == pixmaps
+    other.deleteLater()
+
+    # 値のバーはレイヤーの左側だけを転送している
+    y = slider.height() // 2
+    assert image.pixelColor(50, y) == slider.color()
+    assert image.pixelColor(150, y) == slider.backgroundColor()
+
+    # 色やサイズが変わったら別のレイヤーになる
+    slider.setColor(QtGui.QColor(200, 40, 40))
+    slider.grab()
+    assert len(layer_keys()) == 3
+    slider.resize(120, 20)
+    slider.grab()
+    assert len(layer_keys()) == 5
+    slider.deleteLater()
+
+
+def test_layer_cache_is_bounded(qapp, slider):
+    FloatSlider._layer_cache.clear()
+    for index in range(FloatSlider.kLayerCacheSize + 10):
+        slider.setColor(QtGui.QColor(index, 0, 0))
+        slider.grab()
+    assert len(FloatSlider._layer_cache) == FloatSlider.kLayerCacheSize
+
+
+def test_symbol_layer_follows_hover_state(qapp):
+    FloatSlider._layer_cache.clear()
+    slider = FloatSymbolSlider()
+    slider.resize(200, 20)
+    slider._hovered = True
+    slider.grab()
+    symbol_keys = [key for key in layer_keys() if "symbols" in key]
+    slider.grab()
+    assert [key for key in layer_keys() if "symbols" in key] == symbol_keys
+
+    slider._hovered_left_symbol = True
+    slider.grab()
+    assert len([key for key in layer_keys() if "symbols" in key]) == len(symbol_keys) + 1
+    slider.deleteLater()
+
+
+def click(widget, x=100):
+    send_mouse(widget, QtCore.QEvent.MouseButtonPress, x)
+    send_mouse(widget, QtCore.QEvent.MouseButtonRelease, x)
+
+
+def test_sliders_share_one_pooled_editor(qapp):
+    sliders = [FloatSlider() for _ in range(20)]
+    # 入力モードになるまでエディタは作らない
+    assert all(not slider.findChildren(QtWidgets.QLineEdit) for slider in sliders)
+
+    first, second = sliders[0], sliders[1]
+    first.resize(200, 20)
+    second.resize(200, 20)
+    first.setRange(0.0, 2.0)
+    first.setDecimals(2)
+    changed = []
+    first.valueChanged.connect(changed.append)
+
+    click(first)
+    editor = first._line_edit
+    assert editor is not None and editor.parent() is first
+    assert editor.text() == "0.50"
+
+    # 確定すると値を範囲と桁数に合わせて適用し、エディタをプールに戻す
+    editor.setText("1.23456")
+    editor.returnPressed.emit()
+    editor.editingFinished.emit()
+    assert changed == [1.23]
+    assert first._line_edit is None
+    assert editor.parent() is None and editor.isHidden()
+    assert editor in FloatSlider._editor_pool
+
+    click(second)
+    assert second._line_edit is editor
+    editor.setText("5")
+    editor.returnPressed.emit()
+    assert second.value() == 1.0
+    assert changed == [1.23]
+    for slider in sliders:
+        slider.deleteLater()
+    qapp.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+
+def test_editor_destroyed_with_slider_leaves_pool(qapp):
+    slider = FloatSlider()
+    slider.resize(200, 20)
+    click(slider)
+    editor = slider._line_edit
+    assert editor not in FloatSlider._editor_pool
+    pool = list(FloatSlider._editor_pool)
+    slider.deleteLater()
+    qapp.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+    # 入力中に破棄されたエディタはプールに戻らず、次は別のエディタを借りる
+    assert FloatSlider._editor_pool == pool
+    other = FloatSlider()
+    other.resize(200, 20)
+    click(other)
+    assert other._line_edit.parent() is other
+    other._line_edit.returnPressed.emit()
+    assert other.value() == 0.5
+    other.deleteLater()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""FloatSliderBank の一括操作と、bind したスライダーへの反映の確認"""
+import numpy as np
+import pytest
+
+from utils import QtCore, FloatSlider, FloatSliderBank
+
+
+class CountingSlider(FloatSlider):
+    """モデルから setValue された回数を数える FloatSlider"""
+    def __init__(self, parent=None):
+        super(CountingSlider, self).__init__(parent)
+        self.set_calls = 0
+
+    def setValue(self, value):
+        self.set_calls += 1
+        super(CountingSlider, self).setValue(value)
+
+
+@pytest.fixture
+def bank(qapp):
+    bank = FloatSliderBank(6)
+    emits = []
+    bank.valuesChanged.connect(lambda indices: emits.append(indices.tolist()))
+    bank.emits = emits
+    yield bank
+    bank.deleteLater()
+
+
+def test_batch_operations_notify_changed_indices_once(qapp, bank):
+    bank.setValues([0.1, 0.2, 0.5, 0.5, 0.8, 0.9])
+    # 初期値 0.5 のままのインデックスは含めない
+    assert bank.emits == [[0, 1, 4, 5]]
+
+    bank.scale(2.0, [0, 1, 2])
+    np.testing.assert_allclose(bank.values(), [0.2, 0.4, 1.0, 0.5, 0.8, 0.9])
+    assert bank.emits[-1] == [0, 1, 2]
+
+    bank.setRange(0.0, 0.6)
+    bank.scale(1.0)
+    assert len(bank.emits) == 2
+    bank.clamp()
+    np.testing.assert_allclose(bank.values(), [0.2, 0.4, 0.6, 0.5, 0.6, 0.6])
+    assert bank.emits[-1] == [2, 4, 5]
+
+    bank.normalize([0, 1])
+    np.testing.assert_allclose(bank.values([0, 1]), [1.0 / 3, 2.0 / 3])
+    bank.setValues(0.0, [2, 3])
+    bank.normalize([2, 3])
+    np.testing.assert_allclose(bank.values([2, 3]), [0.5, 0.5])
+    assert len(bank.emits) == 6
+
+
+def test_quantize_matches_slider_drag(qapp, bank):
+    bank.setSingleStep([0.25, 0.1, 0.0, 0.001, 0.5, 0.2])
+    bank.setDecimals(2)
+    bank.setValues([0.3, 0.26, 0.123456, 0.4567, 0.76, 0.5])
+    bank.quantize()
+    # FloatSlider のドラッグと同じく step の倍数に丸めてから decimals の桁数に丸める
+    expected = [round(round(value / step) * step, 2) if step > 0 else round(value, 2)
+                for value, step in zip([0.3, 0.26, 0.123456, 0.4567, 0.76, 0.5], [0.25, 0.1, 0.0, 0.001, 0.5, 0.2])]
+    np.testing.assert_allclose(bank.values(), expected)
+
+
+def test_bound_sliders_update_only_changed_values(qapp, bank):
+    sliders = [CountingSlider() for _ in range(6)]
+    for index, slider in enumerate(sliders):
+        bank.bind(slider, index)
+        slider.set_calls = 0
+
+    bank.setValues([0.5, 0.5, 0.7, 0.5, 0.5, 0.1])
+    assert [slider.set_calls for slider in sliders] == [0, 0, 1, 0, 0, 1]
+    assert [slider.value() for slider in sliders] == [0.5, 0.5, 0.7, 0.5, 0.5, 0.1]
+
+    # スライダーの操作はモデルに書き戻される
+    sliders[3].valueChanged.emit(0.25)
+    assert bank.value(3) == 0.25
+    assert bank.emits[-1] == [3]
+
+    # 破棄されたスライダーは結びつけから外れる
+    sliders.pop(1).deleteLater()
+    qapp.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    assert 1 not in bank._sliders
+    assert len(bank._slider_indexes) == len(bank._destroyed_slots) == 5
+    bank.setValues(0.0)
+    assert all(slider.value() == 0.0 for slider in sliders)
+
+    bank.unbind(sliders[0])
+    bank.setValues(1.0)
+    assert sliders[0].value() == 0.0
+    for slider in sliders:
+        slider.deleteLater()
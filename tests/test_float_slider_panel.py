@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""FloatSliderPanel の行単位のヒットテストと、表示中の行だけの描画の確認"""
+import pytest
+
+from utils import QtCore, QtGui, FloatSliderPanel
+
+ROWS = 500
+
+
+def send_mouse(widget, event_type, x, y):
+    pos = QtCore.QPointF(x, y)
+    button = QtCore.Qt.NoButton if event_type == QtCore.QEvent.MouseMove else QtCore.Qt.LeftButton
+    buttons = QtCore.Qt.NoButton if event_type == QtCore.QEvent.MouseButtonRelease else QtCore.Qt.LeftButton
+    event = QtGui.QMouseEvent(event_type, pos, widget.mapToGlobal(pos), button, buttons, QtCore.Qt.NoModifier)
+    QtCore.QCoreApplication.sendEvent(widget, event)
+
+
+@pytest.fixture
+def panel(qapp):
+    panel = FloatSliderPanel()
+    panel.setSpacing(3)
+    for row in range(ROWS):
+        panel.addSlider("row {}".format(row), value=0.0, decimals=2, step=0.01)
+    panel.resize(300, 240)
+    panel.show()
+    qapp.processEvents()
+    yield panel
+    panel.close()
+    panel.deleteLater()
+    qapp.processEvents()
+
+
+@pytest.mark.parametrize("scroll", [0, 7, 1234, None])
+def test_row_at_matches_row_rect(qapp, panel, scroll):
+    scroll_bar = panel.verticalScrollBar()
+    scroll_bar.setValue(scroll_bar.maximum() if scroll is None else scroll)
+    first, last = panel._visibleRows()
+    rects = dict((row, panel.rowRect(row)) for row in range(max(0, first - 1), min(ROWS, last + 1)))
+    for y in range(-5, panel.viewport().height() + 5):
+        point = QtCore.QPoint(150, y)
+        expected = [row for row, rect in rects.items() if rect.contains(point)]
+        assert [panel.rowAt(point)] == (expected or [-1]), y
+
+
+def test_drag_reports_row_under_press(qapp, panel):
+    panel.verticalScrollBar().setValue(1000)
+    moved, changed = [], []
+    panel.sliderMoved.connect(lambda row, value: moved.append((row, value)))
+    panel.valueChanged.connect(lambda row, value: changed.append((row, value)))
+    viewport = panel.viewport()
+    rect = panel.rowRect(panel.rowAt(QtCore.QPoint(150, 50)))
+    row = panel.rowAt(rect.center())
+    y = rect.center().y()
+
+    # ラベル部分や行間では操作しない
+    send_mouse(viewport, QtCore.QEvent.MouseButtonPress, panel.labelWidth() - 1, y)
+    send_mouse(viewport, QtCore.QEvent.MouseButtonPress, 150, rect.bottom() + 2)
+    assert panel._pressed_row == -1
+
+    # 押した行のままドラッグし、ほかの行の上に移動しても値はその行に入る
+    bar_width = viewport.width() - panel.labelWidth()
+    send_mouse(viewport, QtCore.QEvent.MouseButtonPress, panel.labelWidth() + 10, y)
+    send_mouse(viewport, QtCore.QEvent.MouseMove, panel.labelWidth() + bar_width // 2, y)
+    send_mouse(viewport, QtCore.QEvent.MouseMove, panel.labelWidth() + bar_width // 4, y + 60)
+    send_mouse(viewport, QtCore.QEvent.MouseButtonRelease, panel.labelWidth() + bar_width // 4, y + 60)
+    assert [entry[0] for entry in moved] == [row, row]
+    assert moved[0][1] == pytest.approx(0.5, abs=0.01)
+    assert changed == [(row, panel.value(row))]
+    assert panel.value(row) == pytest.approx(0.25, abs=0.01)
+    assert [panel.value(other) for other in range(ROWS) if other != row] == [0.0] * (ROWS - 1)
+
+
+def test_paints_only_visible_rows(qapp, panel):
+    scroll_bar = panel.verticalScrollBar()
+    for value in [0, 500, scroll_bar.maximum()]:
+        scroll_bar.setValue(value)
+        panel.viewport().repaint()
+        first, last = panel._visibleRows()
+        # 描画した行のテキストだけを保持している
+        assert sorted(panel._texts) == list(range(first, last))
+        assert last - first <= panel.viewport().height() // (panel.rowHeight() + panel.spacing()) + 2
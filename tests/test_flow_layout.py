@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""FlowLayout の部分的な再配置が、最初から配置し直した結果と一致することの確認"""
+import random
+
+import pytest
+
+from utils import QtCore, QtWidgets, FlowLayout, _UniformFlowGeometry
+
+STEPS = 300
+WIDTHS = [20, 31, 33, 100, 250, 500]
+MIXED_SIZES = [(32, 32)] * 6 + [(60, 20), (32, 48), (400, 10)]
+UNIFORM_SIZES = [(32, 32)]
+
+
+class Box(QtWidgets.QWidget):
+    """sizeHint を変えて updateGeometry で通知するウィジェット"""
+    def __init__(self, size):
+        super(Box, self).__init__()
+        self._size = QtCore.QSize(*size)
+
+    def sizeHint(self):
+        return self._size
+
+    def minimumSizeHint(self):
+        return self._size
+
+    def setSize(self, size):
+        self._size = QtCore.QSize(*size)
+        self.updateGeometry()
+
+
+class CountingBox(Box):
+    """sizeHint が呼ばれた回数を数える Box"""
+    def __init__(self, size):
+        super(CountingBox, self).__init__(size)
+        self.calls = 0
+
+    def sizeHint(self):
+        self.calls += 1
+        return super(CountingBox, self).sizeHint()
+
+    def minimumSizeHint(self):
+        self.calls += 1
+        return super(CountingBox, self).minimumSizeHint()
+
+
+def reference_geometry(layout, width):
+    """アイテムの現在のサイズから最初から配置した (rects, height)"""
+    right = width - 1
+    spacing = layout.spacing()
+    x = y = row_height = 0
+    new_row = False
+    rects = []
+    for item in layout._items:
+        size = item.sizeHint()
+        if not new_row and x + size.width() > right:
+            x = 0
+            y += row_height + layout.verticalSpacing()
+            row_height = 0
+            new_row = True
+        rects.append((x, y, size.width(), size.height()))
+        new_row = False
+        x += size.width() + spacing
+        row_height = max(row_height, size.height())
+    return rects, (y + row_height if rects else 0)
+
+
+def check_layout(layout):
+    """キャッシュ済みの幅ごとの配置結果と、適用済みのアイテムの位置を確認
+
+    Returns:
+        bool: 適用中の配置結果が均一な格子だった
+    """
+    rect = layout.geometry()
+    widths = set(layout._layout_cache) | {rect.width()}
+    for width in sorted(widths):
+        geometry = layout._geometryFor(width)
+        rects, height = reference_geometry(layout, width)
+        assert geometry.rects == rects, width
+        assert geometry.height == height, width
+        assert layout.heightForWidth(width) == height, width
+
+    rects, height = reference_geometry(layout, rect.width())
+    applied = [(item.geometry().x() - rect.x(), item.geometry().y() - rect.y(), item.geometry().width(), item.geometry().height())
+               for item in layout._items]
+    assert applied == rects
+
+    minimum = QtCore.QSize(0, 0)
+    for item in layout._items:
+        minimum = minimum.expandedTo(item.minimumSize())
+    assert layout.minimumSize() == minimum
+    return isinstance(layout._geometryFor(rect.width()), _UniformFlowGeometry)
+
+
+@pytest.fixture
+def host(qapp):
+    host = QtWidgets.QWidget()
+    yield host
+    host.close()
+    host.deleteLater()
+    qapp.processEvents()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("sizes", [MIXED_SIZES, UNIFORM_SIZES], ids=["mixed", "uniform"])
+def test_incremental_matches_full_layout(qapp, host, seed, sizes):
+    rng = random.Random(seed)
+    layout = FlowLayout(host)
+    layout.setSpacing(rng.choice([0, 3, 5]))
+    for _ in range(20):
+        layout.addWidget(Box(rng.choice(sizes)))
+    host.resize(250, 800)
+    host.show()
+    qapp.processEvents()
+
+    uniform = 0
+    for step in range(STEPS):
+        operation = rng.random()
+        count = layout.count()
+        if operation < 0.4 or count == 0:
+            layout.insertWidget(rng.randint(0, count), Box(rng.choice(sizes)))
+        elif operation < 0.7:
+            layout.takeAt(rng.randrange(count)).widget().deleteLater()
+        elif operation < 0.9:
+            layout.itemAt(rng.randrange(count)).widget().setSize(rng.choice(sizes))
+        else:
+            host.resize(rng.choice(WIDTHS), 800)
+        qapp.processEvents()
+        uniform += check_layout(layout)
+
+    # 均一なサイズの場合は格子の配置結果、混在する場合は通常の配置結果を確認している
+    if sizes is UNIFORM_SIZES:
+        assert uniform == STEPS
+    else:
+        assert uniform < STEPS
+
+
+def test_refresh_remeasures_only_changed_widgets(qapp, host):
+    layout = FlowLayout(host)
+    boxes = [CountingBox((32, 32)) for _ in range(50)]
+    layout.addWidgets(boxes)
+    host.resize(250, 800)
+    host.show()
+    qapp.processEvents()
+    for box in boxes:
+        box.calls = 0
+
+    boxes[7].setSize((60, 20))
+    qapp.processEvents()
+
+    # 変更を通知したウィジェットだけが再計測され、キャッシュにも反映されている
+    assert [index for index, box in enumerate(boxes) if box.calls] == [7]
+    assert (layout._widths[7], layout._heights[7]) == (60, 20)
+    assert layout.minimumSize() == QtCore.QSize(60, 32)
+    check_layout(layout)
+
+
+class CountingFlowLayout(FlowLayout):
+    """setGeometry と _reflow が呼ばれた回数を数える FlowLayout"""
+    def __init__(self, parent=None):
+        super(CountingFlowLayout, self).__init__(parent)
+        self.geometry_calls = 0
+        self.reflow_calls = 0
+
+    def setGeometry(self, rect):
+        self.geometry_calls += 1
+        super(CountingFlowLayout, self).setGeometry(rect)
+
+    def _reflow(self, index, delta, last=None):
+        self.reflow_calls += 1
+        super(CountingFlowLayout, self)._reflow(index, delta, last)
+
+
+def test_batch_update_lays_out_once(qapp, host):
+    layout = CountingFlowLayout(host)
+    layout.addWidgets(Box((32, 32)) for _ in range(10))
+    host.resize(250, 800)
+    host.show()
+    qapp.processEvents()
+    layout.geometry_calls = layout.reflow_calls = 0
+
+    boxes = [Box(size) for size in MIXED_SIZES * 20]
+    with layout.batchUpdate():
+        for box in boxes:
+            layout.addWidget(box)
+        assert not host.updatesEnabled()
+        # 追加のたびの部分的な再配置も、レイアウトの適用も行われない
+        assert (layout.geometry_calls, layout.reflow_calls) == (0, 0)
+    assert host.updatesEnabled()
+    assert (layout.geometry_calls, layout.reflow_calls) == (0, 0)
+    assert layout._applied_geometry is None
+
+    # 抜けた後は Qt の activate で配置され、遅延表示されたウィジェットも含めて正しく並ぶ
+    qapp.processEvents()
+    assert layout.geometry_calls > 0
+    assert all(box.isVisible() for box in boxes)
+    check_layout(layout)
+
+
+@pytest.mark.parametrize("sizes", [MIXED_SIZES, UNIFORM_SIZES], ids=["mixed", "uniform"])
+def test_hit_testing_matches_item_geometry(qapp, host, sizes):
+    rng = random.Random(4)
+    layout = FlowLayout(host)
+    layout.setContentsMargins(7, 11, 7, 11)
+    layout.addWidgets(Box(rng.choice(sizes)) for _ in range(80))
+    host.resize(250, 2000)
+    host.show()
+    qapp.processEvents()
+    rects = [item.geometry() for item in layout._items]
+
+    for _ in range(500):
+        point = QtCore.QPoint(rng.randrange(-10, 260), rng.randrange(-10, 1200))
+        expected = [index for index, rect in enumerate(rects) if rect.contains(point)]
+        assert [layout.indexAt(point)] == (expected or [-1]), point
+
+    for _ in range(200):
+        rect = QtCore.QRect(rng.randrange(-10, 260), rng.randrange(-10, 1200), rng.randrange(1, 120), rng.randrange(1, 120))
+        expected = [layout._items[index] for index, item_rect in enumerate(rects) if item_rect.intersects(rect)]
+        assert layout.itemsIn(rect) == expected, rect
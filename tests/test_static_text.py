@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""StaticText がフォント・画面の変更のときだけレイアウトし直すことの確認"""
+from utils import QtCore, QtGui, QtWidgets, ColorLabel, StaticText
+
+
+class CountingStaticText(QtGui.QStaticText):
+    """prepare が呼ばれた回数を数える QStaticText"""
+    def __init__(self):
+        super(CountingStaticText, self).__init__()
+        self.prepares = 0
+
+    def prepare(self, transform, font):
+        self.prepares += 1
+        super(CountingStaticText, self).prepare(transform, font)
+
+
+def test_label_relayouts_text_on_font_change(qapp):
+    label = ColorLabel("label")
+    label.resize(120, 20)
+    counting = label._static_text._static_text = CountingStaticText()
+    label.grab()
+    label.grab()
+    assert counting.prepares == 1
+
+    # FontChange で新しいフォントが渡され、次の描画で一度だけレイアウトし直す
+    font = QtGui.QFont(label.font())
+    font.setPointSize(font.pointSize() + 6)
+    label.setFont(font)
+    assert label._static_text._font_key == (font.key(), label.devicePixelRatioF())
+    label.grab()
+    label.grab()
+    assert counting.prepares == 2
+
+    # 画面の変更でも DPR を確認し直す (変わっていなければレイアウトはそのまま)
+    QtCore.QCoreApplication.sendEvent(label, QtCore.QEvent(QtCore.QEvent.DevicePixelRatioChange))
+    label.grab()
+    assert counting.prepares == 2
+
+    label.setText("changed")
+    label.grab()
+    assert counting.prepares == 3
+    label.deleteLater()
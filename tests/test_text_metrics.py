@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""TextMetricsCache の破棄と保持する数の確認"""
+from utils import QtCore, QtGui, TextMetricsCache
+
+
+def font_changed_receivers(qapp):
+    return qapp.receivers(QtCore.SIGNAL("fontChanged(QFont)"))
+
+
+def test_app_font_change_invalidates_advances(qapp):
+    receivers = font_changed_receivers(qapp)
+    cache = TextMetricsCache()
+    # 接続は最初に計測したときに一度だけ行う
+    assert font_changed_receivers(qapp) == receivers
+    font = QtGui.QFont(qapp.font())
+    for text in ["a", "bb", "ccc"]:
+        cache.horizontalAdvance(font, text)
+    cache.height(font)
+    assert font_changed_receivers(qapp) == receivers + 1
+    assert cache.count() == 3
+
+    original = qapp.font()
+    try:
+        changed = QtGui.QFont(original)
+        changed.setPointSize(original.pointSize() + 9)
+        qapp.setFont(changed)
+        assert cache.count() == 0
+        assert cache.horizontalAdvance(changed, "ccc") == QtGui.QFontMetrics(changed).horizontalAdvance("ccc")
+    finally:
+        qapp.setFont(original)
+        cache.deleteLater()
+
+
+def test_font_metrics_are_bounded(qapp):
+    cache = TextMetricsCache()
+    fonts = [QtGui.QFont(qapp.font().family(), size) for size in range(6, 6 + cache.kMetricsCacheSize * 2)]
+    for font in fonts:
+        assert cache.horizontalAdvance(font, "text") == QtGui.QFontMetrics(font).horizontalAdvance("text")
+    assert len(cache._metrics) == cache.kMetricsCacheSize
+    # 最近使ったフォントが残っている
+    assert list(cache._metrics) == [font.key() for font in fonts[-cache.kMetricsCacheSize:]]
+    cache.deleteLater()
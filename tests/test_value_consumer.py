@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""FloatSlider.setConsumer の最新の値を優先する実行と、終了時のワーカーの停止の確認"""
+import threading
+
+import pytest
+
+from utils import QtCore, FloatSlider, _ValueConsumer
+
+
+def wait_until(condition, timeout=5000):
+    """条件を満たすまでイベントループを回す (ワーカーからのシグナルを受け取る)"""
+    timer = QtCore.QElapsedTimer()
+    timer.start()
+    while not condition() and timer.elapsed() < timeout:
+        loop = QtCore.QEventLoop()
+        QtCore.QTimer.singleShot(5, loop.quit)
+        loop.exec()
+    return condition()
+
+
+@pytest.fixture
+def slider(qapp):
+    slider = FloatSlider()
+    finished, failed = [], []
+    slider.consumerFinished.connect(lambda value, result: finished.append((value, result)))
+    slider.consumerFailed.connect(lambda value, error: failed.append((value, error)))
+    slider.finished = finished
+    slider.failed = failed
+    yield slider
+    slider.setConsumer(None)
+    slider.deleteLater()
+
+
+def test_latest_value_wins(qapp, slider):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def consume(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 10
+
+    slider.setConsumer(consume)
+    slider.sliderMoved.emit(1.0)
+    assert started.wait(5)
+    # 実行中に届いた値は最新のものだけを保留する
+    for value in [2.0, 3.0, 4.0, 5.0]:
+        slider.sliderMoved.emit(value)
+    assert slider.consumerQueueDepth() == 2
+    assert slider.consumerDroppedCount() == 3
+
+    release.set()
+    assert wait_until(lambda: len(slider.finished) == 2)
+    assert calls == [1.0, 5.0]
+    assert slider.finished == [(1.0, 10.0), (5.0, 50.0)]
+    assert slider.consumerQueueDepth() == 0
+    assert len(slider.consumerLatencies()) == 2
+
+
+def test_failure_and_cancel(qapp, slider):
+    def fail(value):
+        raise ValueError(value)
+
+    slider.setConsumer(fail)
+    slider.valueChanged.emit(0.25)
+    assert wait_until(lambda: slider.failed)
+    assert slider.failed[0][0] == 0.25 and isinstance(slider.failed[0][1], ValueError)
+
+    # 解除した後に完了したタスクの結果は送出しない
+    release = threading.Event()
+    slider.setConsumer(lambda value: release.wait(5))
+    slider.valueChanged.emit(0.5)
+    slider.setConsumer(None)
+    release.set()
+    wait_until(lambda: False, timeout=50)
+    assert slider.finished == []
+
+
+def test_shared_executor_shuts_down_on_quit(qapp, slider):
+    slider.setConsumer(lambda value: value)
+    executor = _ValueConsumer._shared_executor
+    assert executor is not None
+    assert qapp.receivers(QtCore.SIGNAL("aboutToQuit()")) >= 1
+
+    qapp.aboutToQuit.emit()
+    assert _ValueConsumer._shared_executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+
+    # 次に使うときは新しいスレッドプールを作る
+    slider.setConsumer(lambda value: value * 2)
+    slider.valueChanged.emit(2.0)
+    assert wait_until(lambda: slider.finished)
+    assert slider.finished == [(2.0, 4.0)]
+    assert _ValueConsumer._shared_executor is not executor
@@ -1,9 +1,23 @@
 # -*- coding: utf-8 -*-
+import array
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import math
+import os
+import time
+import weakref
 
 try:
     from PySide6 import QtWidgets, QtGui, QtCore
 except ImportError:
     from PySide2 import QtWidgets, QtGui, QtCore
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # FloatSliderBank を使う場合だけ必要
     
 
 
@@ -15,6 +29,241 @@ def get_font():
     return app.font()
     # print(f"フォント名: {default_font.family()}, サイズ: {default_font.pointSize(), default_font.pixelSize()}")
 
+class TextMetricsCache(QtCore.QObject):
+    """プロセス全体で共有するテキスト計測結果の LRU キャッシュ
+    (フォントのキー, テキスト) ごとに文字幅・高さ・省略文字列を保持する
+    アプリケーションのフォントが変わると破棄される
+    """
+    kMetricsCacheSize = 64  # 保持する QFontMetrics の数
+    
+    def __init__(self, max_size=4096, parent=None):
+        super(TextMetricsCache, self).__init__(parent)
+        self._max_size  = max_size
+        self._entries   = collections.OrderedDict()
+        self._metrics   = collections.OrderedDict()    # フォントのキー: QFontMetrics
+        self._app       = None  # フォントの変更を接続済みの QApplication
+        self._hits      = 0
+        self._misses    = 0
+    
+    # public method
+    def horizontalAdvance(self, font, text):
+        """テキストの文字幅を返す
+
+        Args:
+            font (QtGui.QFont): フォント
+            text (str): テキスト
+
+        Returns:
+            int: 文字幅
+        """
+        return self._lookup(font, text)[0]
+    
+    def height(self, font):
+        """フォントの高さを返す
+
+        Returns:
+            int: 高さ
+        """
+        return self._fontMetrics(font).height()
+    
+    def size(self, font, text):
+        """テキストの文字幅と高さを返す
+
+        Returns:
+            tuple: (文字幅, 高さ)
+        """
+        return self._lookup(font, text)
+    
+    def elidedText(self, font, text, width, mode=QtCore.Qt.ElideRight):
+        """幅に収まるよう省略したテキストを返す
+
+        Args:
+            font (QtGui.QFont): フォント
+            text (str): テキスト
+            width (int): 最大幅
+            mode (QtCore.Qt.TextElideMode): 省略位置
+
+        Returns:
+            str: 省略したテキスト
+        """
+        key = (font.key(), text, width, mode)
+        elided = self._get(key)
+        if elided is None:
+            elided = self._fontMetrics(font).elidedText(text, mode, width)
+            self._set(key, elided)
+        return elided
+    
+    def hits(self):
+        return self._hits
+    
+    def misses(self):
+        return self._misses
+    
+    def count(self):
+        return len(self._entries)
+    
+    def maxSize(self):
+        return self._max_size
+    
+    def setMaxSize(self, max_size):
+        self._max_size = max_size
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+    
+    def resetCounters(self):
+        self._hits = 0
+        self._misses = 0
+    
+    def clear(self, *args):
+        """キャッシュをすべて破棄"""
+        self._entries.clear()
+        self._metrics.clear()
+    
+    # private method
+    def _connectApplication(self):
+        """QApplication が作られていれば、フォントの変更でキャッシュを破棄するよう接続する
+        キャッシュは QApplication より先に作られることがあるので、計測して保持するときに確認する
+        """
+        app = QtWidgets.QApplication.instance()
+        if app is None or app is self._app:
+            return
+        self._app = app
+        app.fontChanged.connect(self.clear)
+        app.fontDatabaseChanged.connect(self.clear)
+    
+    def _fontMetrics(self, font):
+        key = font.key()
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            self._connectApplication()
+            metrics = QtGui.QFontMetrics(font)
+            self._metrics[key] = metrics
+            if len(self._metrics) > self.kMetricsCacheSize:
+                self._metrics.popitem(last=False)
+        else:
+            self._metrics.move_to_end(key)
+        return metrics
+    
+    def _lookup(self, font, text):
+        key = (font.key(), text)
+        size = self._get(key)
+        if size is None:
+            metrics = self._fontMetrics(font)
+            size = (metrics.horizontalAdvance(text), metrics.height())
+            self._set(key, size)
+        return size
+    
+    def _get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._entries.move_to_end(key)
+        return value
+    
+    def _set(self, key, value):
+        self._connectApplication()
+        self._entries[key] = value
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+_text_metrics = None
+
+def get_text_metrics():
+    """共有のテキスト計測キャッシュを返す
+
+    Returns:
+        TextMetricsCache: キャッシュ
+    """
+    global _text_metrics
+    if _text_metrics is None:
+        _text_metrics = TextMetricsCache()
+    return _text_metrics
+
+class StaticText(object):
+    """レイアウト済みのテキストを保持し、変更があるまで再利用して描画する (QStaticText)
+    フォントと描画先の DPR は setFont で渡し、描画時はテキストの変化だけを確認する
+    """
+    enabled = True  # False の場合は毎回 drawText で描画 (比較用)
+    kDeviceEvents = (QtCore.QEvent.FontChange,
+                     QtCore.QEvent.ScreenChangeInternal,
+                     QtCore.QEvent.DevicePixelRatioChange)  # setFont し直すイベント
+    
+    def __init__(self, font=None, ratio=1.0):
+        self._text = None
+        self._font = QtGui.QFont()
+        self._font_key = None   # (フォントのキー, DPR)
+        self._rect = None
+        self._alignment = None
+        self._pos = QtCore.QPointF()
+        self._size = QtCore.QSizeF()
+        self._static_text = QtGui.QStaticText()
+        self._static_text.setTextFormat(QtCore.Qt.PlainText)
+        if font is not None:
+            self.setFont(font, ratio)
+    
+    def setFont(self, font, ratio):
+        """描画に使うフォントと描画先の DPR を設定 (FontChange や画面の変更のときに呼ぶ)
+        どちらかが変わった場合だけ、次の描画でレイアウトし直す
+
+        Args:
+            font (QtGui.QFont): ペインターに設定するフォント
+            ratio (float): 描画先の devicePixelRatioF
+        """
+        key = (font.key(), ratio)
+        if key != self._font_key:
+            self._font = QtGui.QFont(font)
+            self._font_key = key
+            self._text = None
+    
+    def draw(self, painter, rect, alignment, text):
+        """矩形内に配置してテキストを描画
+
+        Args:
+            painter (QtGui.QPainter): ペインター (setFont したフォントを設定しておく)
+            rect (QtCore.QRect): 配置する矩形
+            alignment (QtCore.Qt.Alignment): 配置
+            text (str): テキスト
+        """
+        if not StaticText.enabled:
+            painter.drawText(rect, alignment, text)
+            return
+        
+        if text != self._text:
+            self._static_text.setText(text)
+            self._static_text.prepare(QtGui.QTransform(), self._font)
+            self._size = self._static_text.size()
+            self._text = text
+            self._rect = None
+        
+        if self._rect is None or rect != self._rect or alignment != self._alignment:
+            self._rect = QtCore.QRect(rect)
+            self._alignment = alignment
+            self._pos = self._alignedPos(rect, alignment)
+        
+        painter.drawStaticText(self._pos, self._static_text)
+    
+    def invalidate(self):
+        """次の描画でレイアウトし直す"""
+        self._text = None
+    
+    def _alignedPos(self, rect, alignment):
+        if alignment & QtCore.Qt.AlignRight:
+            x = rect.x() + rect.width() - self._size.width()
+        elif alignment & QtCore.Qt.AlignHCenter:
+            x = rect.x() + (rect.width() - self._size.width()) / 2.0
+        else:
+            x = rect.x()
+        
+        if alignment & QtCore.Qt.AlignBottom:
+            y = rect.y() + rect.height() - self._size.height()
+        elif alignment & QtCore.Qt.AlignVCenter:
+            y = rect.y() + (rect.height() - self._size.height()) / 2.0
+        else:
+            y = rect.y()
+        return QtCore.QPointF(x, y)
+
 # ----------------------------------------------------------------------------------
 # 展開・折りたたみ可能なウィジェット
 # ----------------------------------------------------------------------------------
@@ -34,6 +283,19 @@ class CollapsibleFrame(QtWidgets.QWidget):
     kArrow          = 1
     kPlusMinus      = 2
     kCircle         = 3
+    
+    kTitleBarCacheSize = 8  # インスタンスごとに保持するタイトルバーのキャッシュ数
+    
+    kIconAngleStep = 0      # 0 以外の場合、この角度刻みで回転済みアイコンをピクスマップとして共有
+    
+    _unload_queue = []      # 折りたたまれたままコンテンツを保持しているフレーム (weakref)
+    _glyph_paths = {}       # (スタイル, 折りたたみ状態): 原点中心のアイコンのパス
+    _glyph_pixmaps = {}     # 回転角度ごとに描画済みのアイコン
+    _frame_pens = {}        # フレームのスタイル: 枠線のペン
+    
+    kFrameBorderWidth = 2
+    kFrameBorderColor = QtGui.QColor(128, 128, 128)
+    kFrameBackgroundColor = QtGui.QColor(255, 0, 0)
 
     # override method
     def __init__(self, title="Title", color=QtGui.QColor(187, 187, 187), parent=None):
@@ -44,10 +306,23 @@ class CollapsibleFrame(QtWidgets.QWidget):
         self._title_bar_color       = QtGui.QColor(93, 93, 93)
         self._title_bar_height      = 20
         self._icon_color            = QtGui.QColor(238, 238, 238)
+        self._icon_pen              = self._createIconPen(self._icon_color)
         self._icon_alignment        = self.kAlignLeft
         self._icon_style            = self.kTriangle
         self._frame_style           = self.kDefault
         self._rotation_angle        = 0
+        self._progress              = 1.0   # 0.0: 折りたたみ 1.0: 展開
+        self._expanded_height       = 0     # アニメーション中の展開時の高さ
+        self._title_bar_cache       = {}
+        self._content_heights       = {}    # レイアウト直下のウィジェットごとの最小高さ
+        self._content_total         = 0     # _content_heights の合計
+        self._dirty_contents        = set() # 追加・変更が通知され、再計測が必要なウィジェット
+        self._content_factory       = None
+        self._factory_widgets       = []
+        self._is_content_loaded     = False
+        self._unload_timeout        = 0
+        self._unload_count          = 0
+        self._unload_timer          = None
         
         self._is_collapsed          = False
         self._is_collapsable        = True
@@ -55,13 +330,6 @@ class CollapsibleFrame(QtWidgets.QWidget):
         self._is_icon_visible       = True
         self._is_animation_enabled  = True
         
-        self._frame_styles = {
-            self.kDefault:      "#ContentFrame{border: none; background: rgb(255, 0, 0)}",
-            self.kSolid:        "#ContentFrame{border: 2px solid gray;}",
-            self.kRounded:      "#ContentFrame{border: 2px solid gray; border-radius: 6px;}",
-            self.kDashed:       "#ContentFrame{border: 2px dashed gray;}",
-        }
-        
         self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
 
         # メインレイアウト
@@ -79,15 +347,13 @@ class CollapsibleFrame(QtWidgets.QWidget):
         self.content_layout.setContentsMargins(5, 5, 5, 5)
         self.content_layout.setSpacing(5)
         self.main_layout.addWidget(self.frame)
+        self.frame.installEventFilter(self)
 
-        # アニメーション
-        self.frame_animation = QtCore.QPropertyAnimation(self.frame, b"geometry")
-        # self.frame_animation = QtCore.QPropertyAnimation(self.frame, b"maximumHeight")
-        self.frame_animation.setDuration(200)
-        
-        self.icon_animation = QtCore.QVariantAnimation()
-        self.icon_animation.setDuration(200)
-        self.icon_animation.valueChanged.connect(self._updateIconRotation)
+        # アニメーション (展開の進行度を 0.0 - 1.0 で補間し、フレームの最大高さとアイコンの角度に反映)
+        self._animation_duration = 200
+        self.frame_animation = QtCore.QVariantAnimation(self)
+        self.frame_animation.valueChanged.connect(self._applyProgress)
+        self.frame_animation.finished.connect(self._finishProgress)
 
     def mousePressEvent(self, event):
         """タイトルバーのクリックで展開・折りたたみ"""
@@ -99,38 +365,13 @@ class CollapsibleFrame(QtWidgets.QWidget):
         painter = QtGui.QPainter(self)
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
 
-        # タイトルバー描画
-        painter.setBrush(self._title_bar_color)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawRect(0, 0, self.width(), self._title_bar_height)
-
-        # タイトル描画
-        if self._is_title_visible:
-            font = painter.font()
-            font.setBold(True)
-            painter.setFont(font)
-            font_metrics = QtGui.QFontMetrics(font)
-            text_width = font_metrics.horizontalAdvance(self._title)
-            
-            # タイトル位置
-            rect = self.rect()
-            if self._title_alignment == self.kAlignLeft:
-                if self._is_icon_visible and self._icon_alignment == self.kAlignLeft:
-                    text_x = rect.left() + 25
-                else:
-                    text_x = rect.left() + 10
-                
-            elif self._title_alignment == self.kAlignRight:
-                if self._is_icon_visible and self._icon_alignment == self.kAlignRight:
-                    text_x = rect.right() - text_width - 25
-                else:
-                    text_x = rect.right() - text_width - 10
-            else:
-                text_x = rect.right() / 2 - text_width / 2 
+        # フレーム描画
+        if self.frame.isVisible():
+            self._drawFrame(painter)
 
-            painter.setPen(self._title_color)
-            text_rect = QtCore.QRect(text_x, 0, text_width, self._title_bar_height)
-            painter.drawText(text_rect, QtCore.Qt.AlignVCenter, self._title)
+        # タイトルバー描画 (キャッシュ済みのピクスマップを転写)
+        title_bar, text_width = self._titleBarPixmap()
+        painter.drawPixmap(0, 0, title_bar)
         
         # アイコン描画
         if self._is_icon_visible:
@@ -147,14 +388,31 @@ class CollapsibleFrame(QtWidgets.QWidget):
                 else:
                     icon_pos = QtCore.QPoint(self.width() / 2, self._title_bar_height / 2)
 
-            if self._icon_style == self.kTriangle:
-                self._drawTriangle(painter, icon_pos)
-            elif self._icon_style == self.kArrow:
-                self._drawArrow(painter, icon_pos)
-            elif self._icon_style == self.kPlusMinus:
-                self._drawPlusMinus(painter, icon_pos)
-            elif self._icon_style == self.kCircle:
-                self._drawCircle(painter, icon_pos)
+            self._drawIcon(painter, icon_pos)
+
+    def eventFilter(self, obj, event):
+        """コンテンツの変更を監視し、高さのキャッシュを部分的に無効化"""
+        event_type = event.type()
+        if obj is self.frame:
+            if event_type == QtCore.QEvent.ChildAdded:
+                # content_layout に直接追加されたウィジェットも監視し、次の計測で加える
+                child = event.child()
+                if child.isWidgetType():
+                    child.installEventFilter(self)
+                    self._dirty_contents.add(child)
+            elif event_type == QtCore.QEvent.ChildRemoved:
+                self._forgetContent(event.child())
+        elif event_type in (QtCore.QEvent.LayoutRequest, QtCore.QEvent.FontChange, QtCore.QEvent.StyleChange):
+            # 子自身のレイアウトやフォントの変更 (その子だけを次の計測で測り直す)
+            if obj.parent() is self.frame:
+                self._dirty_contents.add(obj)
+        return super(CollapsibleFrame, self).eventFilter(obj, event)
+
+    def showEvent(self, event):
+        """展開状態で表示されたときに遅延コンテンツを生成"""
+        super(CollapsibleFrame, self).showEvent(event)
+        if not self._is_collapsed:
+            self._loadContent()
 
     def resizeEvent(self, event):
         """ウィンドウのリサイズ時にフレームのジオメトリを更新"""
@@ -271,6 +529,30 @@ class CollapsibleFrame(QtWidgets.QWidget):
         """        
         return self._is_collapsable
     
+    def contentFactory(self):
+        """コンテンツを生成する関数を返す
+
+        Returns:
+            callable: 登録されている関数 (未登録の場合は None)
+        """
+        return self._content_factory
+    
+    def isContentLoaded(self):
+        """関数から生成したコンテンツが存在するかどうか
+
+        Returns:
+            bool: 生成済みかどうか
+        """
+        return self._is_content_loaded
+    
+    def unloadPolicy(self):
+        """折りたたみ時にコンテンツを破棄する条件を返す
+
+        Returns:
+            tuple: (timeout, count)
+        """
+        return self._unload_timeout, self._unload_count
+    
     def isAnimationEnabled(self):
         """アニメーションが有効化どうか
 
@@ -314,6 +596,7 @@ class CollapsibleFrame(QtWidgets.QWidget):
     def setIconColor(self, color):
         """アイコンの色を変更する"""
         self._icon_color = color
+        self._icon_pen = self._createIconPen(color)
         self.update()
 
     def setIconAlignment(self, alignment):
@@ -347,6 +630,46 @@ class CollapsibleFrame(QtWidgets.QWidget):
         """アニメーション有効化を変更"""
         self._is_animation_enabled = enabled
 
+    def setCollapsed(self, collapsed):
+        """アニメーションなしで折りたたみ状態を変更"""
+        if collapsed == self._is_collapsed:
+            return
+        
+        self._is_collapsed = collapsed
+        if self._is_collapsed:
+            self._scheduleUnload()
+        else:
+            self._loadContent()
+        
+        self.frame_animation.stop()
+        self._applyProgress(0.0 if self._is_collapsed else 1.0)
+        self._finishProgress()
+        
+        self.toggled.emit(self._is_collapsed)
+        self.update()
+
+    def setContentFactory(self, factory):
+        """コンテンツを生成する関数を登録 (初めて展開されたときに呼ばれる)
+
+        Args:
+            factory (callable): QWidget もしくは QWidget のリストを返す関数
+        """
+        self._unloadContent()
+        self._content_factory = factory
+        if not self._is_collapsed and self.isVisible():
+            self._loadContent()
+    
+    def setUnloadPolicy(self, timeout=0, count=0):
+        """折りたたまれたままのコンテンツを破棄する条件を設定 (0 で無効)
+        破棄したコンテンツは次に展開したときに再生成される
+
+        Args:
+            timeout (int): 折りたたんでから破棄するまでの時間 (ミリ秒)
+            count (int): この後に折りたたまれたフレームがこの数に達したら破棄
+        """
+        self._unload_timeout = max(0, timeout)
+        self._unload_count = max(0, count)
+        
     def setContentsMargins(self, x, y, width, height):
         self.content_layout.setContentsMargins(x, y, width, height)
 
@@ -358,206 +681,1031 @@ class CollapsibleFrame(QtWidgets.QWidget):
         self.main_layout.setContentsMargins(0, self._title_bar_height, 0, 0)
     
     def _updateFrameStyle(self):
-        """フレームデザインを適用"""
-        self.frame.setStyleSheet(self._frame_styles.get(self._frame_style, "border: 2px solid gray;"))
-
-    def _updateIconRotation(self, value):
-        """アイコンの回転角度を更新"""
-        self._rotation_angle = value
+        """フレームデザインを適用 (枠線の分だけコンテンツを内側に配置)"""
+        if self._frame_style == self.kDefault:
+            self.frame.setContentsMargins(0, 0, 0, 0)
+        else:
+            width = self.kFrameBorderWidth
+            self.frame.setContentsMargins(width, width, width, width)
         self.update()
 
-    def _getContentHeight(self):
-        """レイアウト内のすべてのウィジェットの合計最小高さを取得"""
-        margin = 5
-        total_height = margin
-        for i in range(self.content_layout.count()):
-            item = self.content_layout.itemAt(i)
-            if item.widget():
-                total_height += item.widget().minimumSizeHint().height() + margin
-        return total_height
+    def _framePen(self, style):
+        """フレームの枠線のペンを返す (全インスタンスで共有)"""
+        pen = CollapsibleFrame._frame_pens.get(style)
+        if pen is None:
+            pen = QtGui.QPen(self.kFrameBorderColor)
+            pen.setWidth(self.kFrameBorderWidth)
+            pen.setJoinStyle(QtCore.Qt.MiterJoin)
+            if style == self.kDashed:
+                pen.setStyle(QtCore.Qt.DashLine)
+            CollapsibleFrame._frame_pens[style] = pen
+        return pen
 
-    def _toggle(self):
-        """折りたたみ/展開を切り替え"""
-        self._is_collapsed = not self._is_collapsed
+    def _drawFrame(self, painter):
+        """コンテンツフレームの背景と枠線を描画"""
+        rect = QtCore.QRectF(self.frame.geometry())
+        if self._frame_style == self.kDefault:
+            painter.fillRect(rect, self.kFrameBackgroundColor)
+            return
+        
+        # 枠線の内側に収まるようにペンの中心をずらす
+        half = self.kFrameBorderWidth / 2.0
+        rect.adjust(half, half, -half, -half)
+        painter.setPen(self._framePen(self._frame_style))
+        painter.setBrush(QtCore.Qt.NoBrush)
+        if self._frame_style == self.kRounded:
+            painter.drawRoundedRect(rect, 6 - half, 6 - half)
+        else:
+            painter.drawRect(rect)
 
-        if self._is_animation_enabled:
-            # 展開と折りたたみのアニメーション
-            if self._is_collapsed:
-                start_rect = QtCore.QRect(self.frame.geometry().x(), self.frame.geometry().y(), self.frame.width(), self.frame.height())
-                end_rect = QtCore.QRect(self.frame.geometry().x(), self.frame.geometry().y(), self.frame.width(), 0)
-                self.frame_animation.setStartValue(start_rect)
-                self.frame_animation.setEndValue(end_rect)                
-                # self.frame_animation.setStartValue(self.frame.height())
-                # self.frame_animation.setEndValue(0)
-                self.frame_animation.finished.connect(lambda *args: self.frame.setVisible(not self._is_collapsed))
-            else:
-                
-                start_rect = QtCore.QRect(self.frame.geometry().x(), self.frame.geometry().y(), self.frame.width(), self.frame.height())
-                end_rect = QtCore.QRect(self.frame.geometry().x(), self.frame.geometry().y(), self.frame.width(), max(self._getContentHeight(), self.frame.sizeHint().height(), self.height()-self._title_bar_height))
-                self.frame_animation.setStartValue(start_rect)
-                self.frame_animation.setEndValue(end_rect)
-                
-                # self.frame_animation.setStartValue(0)
-                # self.frame_animation.setEndValue(max(self._getContentHeight(), self.frame_geometry.height()))
-                self.frame.setVisible(not self._is_collapsed)
+    def _titleBarCacheKey(self):
+        """タイトルバーの描画結果を識別するキーを返す"""
+        return (self.width(),
+                self._title,
+                self._title_color.rgba(),
+                self._title_bar_color.rgba(),
+                self._title_alignment,
+                self._icon_alignment,
+                self._is_title_visible,
+                self._is_icon_visible,
+                self._title_bar_height,
+                self.devicePixelRatioF(),
+                self.font().key())
 
-                
-            self.frame_animation.start()
+    def _titleBarPixmap(self):
+        """タイトルバー（背景 + タイトル）のピクスマップを返す
+
+        Returns:
+            tuple: (QtGui.QPixmap, int) ピクスマップとタイトルの文字幅
+        """
+        key = self._titleBarCacheKey()
+        cached = self._title_bar_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        width = max(1, self.width())
+        dpr = self.devicePixelRatioF()
+        pixmap = QtGui.QPixmap(int(width * dpr), int(self._title_bar_height * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(self._title_bar_color)
+        
+        text_width = 0
+        if self._is_title_visible:
+            painter = QtGui.QPainter(pixmap)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+            font = self.font()
+            font.setBold(True)
+            painter.setFont(font)
+            text_width = get_text_metrics().horizontalAdvance(font, self._title)
             
-            # アイコン回転のアニメーション
-            if self._icon_alignment == self.kAlignRight:
-                start_angle = 0 if self._is_collapsed else 90
-                end_angle = 90 if self._is_collapsed else 0
-            else:
-                start_angle = 0 if self._is_collapsed else -90
-                end_angle = -90 if self._is_collapsed else 0
+            # タイトル位置
+            rect = self.rect()
+            if self._title_alignment == self.kAlignLeft:
+                if self._is_icon_visible and self._icon_alignment == self.kAlignLeft:
+                    text_x = rect.left() + 25
+                else:
+                    text_x = rect.left() + 10
                 
-            self.icon_animation.setStartValue(start_angle)
-            self.icon_animation.setEndValue(end_angle)
-            self.icon_animation.start()
-            
-        else:
-            self.frame.setVisible(not self._is_collapsed)
+            elif self._title_alignment == self.kAlignRight:
+                if self._is_icon_visible and self._icon_alignment == self.kAlignRight:
+                    text_x = rect.right() - text_width - 25
+                else:
+                    text_x = rect.right() - text_width - 10
+            else:
+                text_x = rect.right() / 2 - text_width / 2 
+
+            painter.setPen(self._title_color)
+            text_rect = QtCore.QRect(int(text_x), 0, text_width, self._title_bar_height)
+            painter.drawText(text_rect, QtCore.Qt.AlignVCenter, self._title)
+            painter.end()
         
-        self.toggled.emit(self._is_collapsed)
-        self.update()
+        # 古いエントリから破棄してキャッシュ数を制限
+        while len(self._title_bar_cache) >= self.kTitleBarCacheSize:
+            self._title_bar_cache.pop(next(iter(self._title_bar_cache)))
+        self._title_bar_cache[key] = (pixmap, text_width)
+        return pixmap, text_width
 
-    def _drawTriangle(self, painter, center):
-        """展開アイコン（三角形）の描画"""
-        path = QtGui.QPainterPath()
+    def _loadContent(self):
+        """登録された関数からコンテンツを生成"""
+        self._cancelUnload()
+        if self._content_factory is None or self._is_content_loaded:
+            return
         
-        if self._is_animation_enabled:
-            path.moveTo(center.x() - 5, center.y() - 4)
-            path.lineTo(center.x() + 5, center.y() - 4)
-            path.lineTo(center.x(), center.y() + 4)
-            path.closeSubpath()
-            
-            transform = QtGui.QTransform()
-            transform.translate(center.x(), center.y())
-            transform.rotate(self._rotation_angle)
-            transform.translate(-center.x(), -center.y())
-            path = transform.map(path)
-        else:
-            if self._is_collapsed:
-                path.moveTo(center.x() - 4, center.y() - 5)
-                path.lineTo(center.x() - 4, center.y() + 5)
-                path.lineTo(center.x() + 4, center.y())
-            else:
-                path.moveTo(center.x() - 5, center.y() - 4)
-                path.lineTo(center.x() + 5, center.y() - 4)
-                path.lineTo(center.x(), center.y() + 4)
+        widgets = self._content_factory()
+        if widgets is None:
+            widgets = []
+        elif isinstance(widgets, QtWidgets.QWidget):
+            widgets = [widgets]
         
-        painter.setBrush(self._icon_color)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawPath(path)
+        for widget in widgets:
+            self.addWidget(widget)
+        self._factory_widgets = list(widgets)
+        self._is_content_loaded = True
+
+    def _unloadContent(self):
+        """関数から生成したコンテンツを破棄"""
+        self._cancelUnload()
+        if not self._is_content_loaded:
+            return
         
-    def _drawArrow(self, painter, center):
-        """展開アイコン（矢印）の描画"""
-        path = QtGui.QPainterPath()
+        for widget in self._factory_widgets:
+            self.content_layout.removeWidget(widget)
+            self._forgetContent(widget)
+            widget.deleteLater()
+        self._factory_widgets = []
+        self._is_content_loaded = False
+
+    def _scheduleUnload(self):
+        """折りたたみ時にコンテンツ破棄の予約を行う"""
+        if not self._is_content_loaded or self._content_factory is None:
+            return
         
-        if self._is_animation_enabled:
-            path.moveTo(center.x() - 5, center.y() - 2)
-            path.lineTo(center.x(), center.y() + 3)
-            path.lineTo(center.x() + 5, center.y() - 2)
-            
-            transform = QtGui.QTransform()
-            transform.translate(center.x(), center.y())
-            transform.rotate(self._rotation_angle)
-            transform.translate(-center.x(), -center.y())
-            path = transform.map(path)
-        else:
-            if self._is_collapsed:
-                path.moveTo(center.x() - 2, center.y() - 5)
-                path.lineTo(center.x() + 3, center.y())
-                path.lineTo(center.x() - 2, center.y() + 5)
-            else:
-                path.moveTo(center.x() - 5, center.y() - 2)
-                path.lineTo(center.x(), center.y() + 3)
-                path.lineTo(center.x() + 5, center.y() - 2)
+        if self._unload_timeout:
+            if self._unload_timer is None:
+                self._unload_timer = QtCore.QTimer(self)
+                self._unload_timer.setSingleShot(True)
+                self._unload_timer.timeout.connect(self._unloadContent)
+            self._unload_timer.start(self._unload_timeout)
+        
+        if self._unload_count:
+            CollapsibleFrame._unload_queue.append(weakref.ref(self))
+        
+        # 後から折りたたまれたフレーム数が上限に達したものを破棄
+        queue = CollapsibleFrame._unload_queue
+        expired = []
+        for index, ref in enumerate(queue):
+            frame = ref()
+            if frame is None or len(queue) - 1 - index >= frame._unload_count:
+                expired.append(ref)
+        for ref in expired:
+            frame = ref()
+            try:
+                if frame is not None and frame._is_collapsed:
+                    frame._unloadContent()
+            except RuntimeError:
+                # C++ 側が既に削除されている
+                pass
+            if ref in queue:
+                queue.remove(ref)
 
-        pen = QtGui.QPen(self._icon_color)
-        pen.setWidth(2)
-        painter.setPen(pen)
-        painter.setBrush(QtCore.Qt.NoBrush)
-        painter.drawPath(path)
+    def _cancelUnload(self):
+        """予約したコンテンツ破棄を取り消す"""
+        if self._unload_timer is not None:
+            self._unload_timer.stop()
+        CollapsibleFrame._unload_queue[:] = [ref for ref in CollapsibleFrame._unload_queue if ref() not in (None, self)]
+
+    def _collapsedAngle(self):
+        """折りたたみ時のアイコンの回転角度"""
+        return 90 if self._icon_alignment == self.kAlignRight else -90
+
+    def _applyProgress(self, progress):
+        """展開の進行度をフレームの最大高さとアイコンの角度に反映
+
+        Args:
+            progress (float): 0.0: 折りたたみ 1.0: 展開
+        """
+        self._progress = progress
+        # 親レイアウトが描画ごとに一度だけ読む高さ
+        self.frame.setMaximumHeight(int(round(self._expanded_height * progress)))
+        self._rotation_angle = self._collapsedAngle() * (1.0 - progress)
+        self.update()
+
+    def _finishProgress(self):
+        """アニメーション終了時にフレームを最終状態にする"""
+        self.frame.setMaximumHeight(16777215)  # QWIDGETSIZE_MAX
+        self.frame.setVisible(self._progress > 0.0)
+        self.update()
+
+    def _getContentHeight(self):
+        """レイアウト内のすべてのウィジェットの合計最小高さを取得
         
-    def _drawPlusMinus(self, painter, center):
-        """展開アイコン（プラス、マイナス）の描画"""
-        path = QtGui.QPainterPath()
+        子ごとのイベント (ChildAdded, LayoutRequest など) で通知されたウィジェットだけを計測し、
+        それ以外はキャッシュした高さを使う
+        """
+        margin = 5
+        for widget in self._dirty_contents:
+            height = widget.minimumSizeHint().height()
+            self._content_total += height - self._content_heights.get(widget, 0)
+            self._content_heights[widget] = height
+            if widget.layout() is not None:
+                # 非表示の間も次の変更で LayoutRequest が届くように有効化し直す
+                widget.layout().activate()
+        self._dirty_contents.clear()
+        return margin + self._content_total + margin * len(self._content_heights)
+
+    def _forgetContent(self, widget):
+        """取り除かれたウィジェットを高さのキャッシュから削除"""
+        height = self._content_heights.pop(widget, None)
+        if height is not None:
+            self._content_total -= height
+        self._dirty_contents.discard(widget)
+    
+    def _expandedHeight(self):
+        """展開時のフレームの高さ"""
+        return max(self._getContentHeight(), self.frame.sizeHint().height(), self.height() - self._title_bar_height)
 
+    def _toggle(self):
+        """折りたたみ/展開を切り替え
+        アニメーション中に呼ばれた場合は現在の進行度から逆方向に再開する
+        """
+        self._is_collapsed = not self._is_collapsed
         if self._is_collapsed:
-            path.moveTo(center.x() - 4, center.y())
-            path.lineTo(center.x() + 4, center.y())
-            path.moveTo(center.x(), center.y() - 5)
-            path.lineTo(center.x(), center.y() + 5)
+            self._scheduleUnload()
         else:
-            path.moveTo(center.x() - 5, center.y())
-            path.lineTo(center.x() + 5, center.y())
+            self._loadContent()
 
-        path.closeSubpath()
+        if self._is_animation_enabled:
+            is_running = self.frame_animation.state() == QtCore.QAbstractAnimation.Running
+            self.frame_animation.stop()
+            if not is_running:
+                # 静止状態からの開始時のみ展開時の高さを決める
+                if self._is_collapsed:
+                    self._expanded_height = self.frame.height()
+                else:
+                    self._expanded_height = self._expandedHeight()
+            
+            end_value = 0.0 if self._is_collapsed else 1.0
+            self.frame.setVisible(True)
+            self.frame_animation.setStartValue(self._progress)
+            self.frame_animation.setEndValue(end_value)
+            self.frame_animation.setDuration(max(1, int(self._animation_duration * abs(end_value - self._progress))))
+            self.frame_animation.start()
+        else:
+            self.frame_animation.stop()
+            self._applyProgress(0.0 if self._is_collapsed else 1.0)
+            self._finishProgress()
+        
+        self.toggled.emit(self._is_collapsed)
+        self.update()
 
-        pen = QtGui.QPen(self._icon_color)
+    def _createIconPen(self, color):
+        """アイコンの線描画用のペンを作成"""
+        pen = QtGui.QPen(color)
         pen.setWidth(2)
-        painter.setPen(pen)
-        painter.setBrush(QtGui.QColor(0, 0, 0))
-        painter.drawPath(path)
+        return pen
 
-    def _drawCircle(self, painter, center):
-        """展開アイコン（プラス、マイナス）の描画"""
-        pen = QtGui.QPen(self._icon_color)
-        pen.setWidth(2)
-        painter.setPen(pen)
+    def _glyphPath(self, style, collapsed):
+        """原点を中心としたアイコンのパスを返す (全インスタンスで共有)
 
-        if self._is_collapsed:
+        Args:
+            style (int): kTriangle = 0 kArrow = 1 kPlusMinus = 2 kCircle = 3
+            collapsed (bool): 折りたたみ状態の形状かどうか
+        """
+        key = (style, collapsed)
+        path = CollapsibleFrame._glyph_paths.get(key)
+        if path is not None:
+            return path
+        
+        path = QtGui.QPainterPath()
+        if style == self.kTriangle:
+            if collapsed:
+                path.moveTo(-4, -5)
+                path.lineTo(-4, 5)
+                path.lineTo(4, 0)
+            else:
+                path.moveTo(-5, -4)
+                path.lineTo(5, -4)
+                path.lineTo(0, 4)
+            path.closeSubpath()
+        elif style == self.kArrow:
+            if collapsed:
+                path.moveTo(-2, -5)
+                path.lineTo(3, 0)
+                path.lineTo(-2, 5)
+            else:
+                path.moveTo(-5, -2)
+                path.lineTo(0, 3)
+                path.lineTo(5, -2)
+        elif style == self.kPlusMinus:
+            if collapsed:
+                path.moveTo(-4, 0)
+                path.lineTo(4, 0)
+                path.moveTo(0, -5)
+                path.lineTo(0, 5)
+            else:
+                path.moveTo(-5, 0)
+                path.lineTo(5, 0)
+            path.closeSubpath()
+        elif style == self.kCircle:
+            path.addEllipse(QtCore.QPointF(0, 0), 5, 5)
+        
+        CollapsibleFrame._glyph_paths[key] = path
+        return path
+
+    def _applyIconStyle(self, painter, style, collapsed):
+        """アイコンのスタイルに合わせてペンとブラシを設定"""
+        if style == self.kTriangle:
             painter.setBrush(self._icon_color)
-        else:
+            painter.setPen(QtCore.Qt.NoPen)
+        elif style == self.kArrow:
+            painter.setPen(self._icon_pen)
             painter.setBrush(QtCore.Qt.NoBrush)
+        elif style == self.kPlusMinus:
+            painter.setPen(self._icon_pen)
+            painter.setBrush(QtGui.QColor(0, 0, 0))
+        elif style == self.kCircle:
+            painter.setPen(self._icon_pen)
+            painter.setBrush(self._icon_color if collapsed else QtCore.Qt.NoBrush)
 
-        painter.drawEllipse(center, 5, 5)
-
-# ----------------------------------------------------------------------------------
-# カラーラベル
-# ----------------------------------------------------------------------------------
-class ColorLabel(QtWidgets.QWidget):
-    def __init__(self, text, color=QtGui.QColor(255, 0, 0), parent=None):
-        super(ColorLabel, self).__init__(parent)
-        self._text          = text
-        self._text_color    = QtGui.QColor(187, 187, 187)
-        self._icon_size     = 10
-        self._icon_color    = color
-        self._margin        = 10
-        self._font          = get_font()
-        self.setSizePolicy(QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum)
+    def _drawIcon(self, painter, center):
+        """展開アイコンの描画
+        共有のパスをペインターの座標変換で配置・回転して描画する
+        """
+        style = self._icon_style
+        angle = 0
+        collapsed = self._is_collapsed
+        if style in (self.kTriangle, self.kArrow) and self._is_animation_enabled:
+            # アニメーション中は展開時の形状を回転させる
+            angle = self._rotation_angle
+            collapsed = False
+        
+        if self.kIconAngleStep:
+            angle = round(angle / float(self.kIconAngleStep)) * self.kIconAngleStep
+            pixmap = self._glyphPixmap(style, collapsed, angle)
+            painter.drawPixmap(QtCore.QPointF(center.x() - 8, center.y() - 8), pixmap)
+            return
+        
+        painter.save()
+        painter.translate(center)
+        if angle:
+            painter.rotate(angle)
+        self._applyIconStyle(painter, style, collapsed)
+        painter.drawPath(self._glyphPath(style, collapsed))
+        painter.restore()
 
-    # override method
-    def sizeHint(self):
-        font_metrics = QtGui.QFontMetrics(self._font)
-        text_width = font_metrics.width(self._text)
-        return QtCore.QSize(self._icon_size + self._margin + text_width, max(self._icon_size, font_metrics.height()))
+    def _glyphPixmap(self, style, collapsed, angle):
+        """指定した角度で描画済みのアイコンのピクスマップを返す (全インスタンスで共有)"""
+        dpr = self.devicePixelRatioF()
+        key = (style, collapsed, angle, self._icon_color.rgba(), dpr)
+        pixmap = CollapsibleFrame._glyph_pixmaps.get(key)
+        if pixmap is not None:
+            return pixmap
         
-    def paintEvent(self, event):
-        painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        if len(CollapsibleFrame._glyph_pixmaps) > 512:
+            CollapsibleFrame._glyph_pixmaps.clear()
         
-        # カラー矩形描画
-        rect = QtCore.QRect(0, (self.height() - self._icon_size) // 2, self._icon_size, self._icon_size)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.setBrush(self._icon_color)
-        painter.drawRect(rect)      
+        pixmap = QtGui.QPixmap(int(16 * dpr), int(16 * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.translate(8, 8)
+        painter.rotate(angle)
+        self._applyIconStyle(painter, style, collapsed)
+        painter.drawPath(self._glyphPath(style, collapsed))
+        painter.end()
         
-        # テキスト描画
-        painter.setFont(self._font)
-        text_x = self._icon_size + self._margin
-        text_rect = QtCore.QRect(text_x, 0, self.width(), self.height())
-        painter.setPen(self._text_color)
-        painter.drawText(text_rect, QtCore.Qt.AlignVCenter, self._text)
+        CollapsibleFrame._glyph_pixmaps[key] = pixmap
+        return pixmap
+
+# ----------------------------------------------------------------------------------
+# 折りたたみフレームのグループ
+# ----------------------------------------------------------------------------------
+class CollapsibleFrameGroup(QtCore.QObject):
+    toggled = QtCore.Signal(list)  # 状態が変わったフレームのインデックスを一度にまとめて発信
+    
+    def __init__(self, parent=None):
+        super(CollapsibleFrameGroup, self).__init__(parent)
+        self._frames                = []
+        self._is_exclusive          = False
+        self._is_animation_enabled  = False
+        self._animated_frames       = []
+        self._destroyed_slots       = {}    # フレーム: destroyed に接続した関数
+        
+        # 全フレーム共通のアニメーション (0.0 -> 1.0 の進行度)
+        self._animation = QtCore.QVariantAnimation(self)
+        self._animation.setDuration(200)
+        self._animation.setStartValue(0.0)
+        self._animation.setEndValue(1.0)
+        self._animation.valueChanged.connect(self._updateAnimation)
+        self._animation.finished.connect(self._finishAnimation)
+    
+    # public method
+    def addFrame(self, frame):
+        """フレームをグループに追加"""
+        if frame in self._frames:
+            return
+        self._frames.append(frame)
+        frame.toggled.connect(self._onFrameToggled)
+        # destroyed の引数は元のフレームと同一のオブジェクトにならないので、フレームを束縛しておく
+        slot = self._destroyed_slots[frame] = lambda obj=None, frame=frame: self._forgetFrame(frame)
+        frame.destroyed.connect(slot)
+    
+    def removeFrame(self, frame):
+        """フレームをグループから削除"""
+        if frame not in self._frames:
+            return
+        self._forgetFrame(frame)
+        frame.toggled.disconnect(self._onFrameToggled)
+        frame.destroyed.disconnect(self._destroyed_slots.pop(frame))
+    
+    def count(self):
+        return len(self._frames)
+    
+    def frame(self, index):
+        if not (0 <= index < len(self._frames)):
+            raise IndexError("Invalid index")
+        return self._frames[index]
+    
+    def frames(self):
+        return list(self._frames)
+    
+    def indexOf(self, frame):
+        return self._frames.index(frame) if frame in self._frames else -1
+    
+    def isExclusive(self):
+        """同時に一つだけ展開するかどうか
+
+        Returns:
+            bool: 有効化状態
+        """
+        return self._is_exclusive
+    
+    def isAnimationEnabled(self):
+        """一括操作時にアニメーションするかどうか
+
+        Returns:
+            bool: 有効化状態
+        """
+        return self._is_animation_enabled
+    
+    def setExclusive(self, exclusive):
+        """同時に一つだけ展開するかどうかを変更"""
+        self._is_exclusive = exclusive
+    
+    def setAnimationEnabled(self, enabled):
+        """一括操作時のアニメーション有効化を変更"""
+        self._is_animation_enabled = enabled
+    
+    def expandAll(self):
+        """すべてのフレームを展開"""
+        self._apply(dict((frame, False) for frame in self._frames))
+    
+    def collapseAll(self):
+        """すべてのフレームを折りたたむ"""
+        self._apply(dict((frame, True) for frame in self._frames))
+    
+    def expand(self, frame):
+        """フレームを展開 (排他モードでは他のフレームを折りたたむ)
+
+        Args:
+            frame (CollapsibleFrame or int): フレームもしくはインデックス
+        """
+        if isinstance(frame, int):
+            frame = self.frame(frame)
+        states = {frame: False}
+        if self._is_exclusive:
+            for other in self._frames:
+                if other is not frame:
+                    states[other] = True
+        self._apply(states)
+    
+    def saveState(self):
+        """フレームの折りたたみ状態を返す (同じタイトルのフレームがあっても区別できるようにインデックスで保存)
+
+        Returns:
+            dict: {グループ内のインデックス: 折りたたみ状態}
+        """
+        return dict((index, frame.isCollapsed()) for index, frame in enumerate(self._frames))
+    
+    def restoreState(self, state):
+        """保存した折りたたみ状態を一括で適用 (範囲外のインデックスは無視)
+
+        Args:
+            state (dict): {グループ内のインデックス: 折りたたみ状態} (JSON から読んだ文字列のキーも可)
+        """
+        states = {}
+        for index, collapsed in state.items():
+            index = int(index)
+            if 0 <= index < len(self._frames):
+                states[self._frames[index]] = bool(collapsed)
+        self._apply(states)
+    
+    # private method
+    def _apply(self, states):
+        """折りたたみ状態を一回のレイアウト・描画でまとめて適用
+
+        Args:
+            states (dict): {CollapsibleFrame: 折りたたみ状態}
+        """
+        self._finishAnimation()
+        changed = [frame for frame, collapsed in states.items() if frame.isCollapsed() != collapsed]
+        if not changed:
+            return
+        
+        # 適用中は親ウィジェットの再描画を止め、レイアウトは再開後の一回にまとめる
+        parents = []
+        for frame in changed:
+            parent = frame.parentWidget()
+            if parent is not None and parent not in parents and parent.updatesEnabled():
+                parent.setUpdatesEnabled(False)
+                parents.append(parent)
+        
+        try:
+            for frame in changed:
+                collapsed = states[frame]
+                if self._is_animation_enabled:
+                    start_progress = frame._progress
+                    if collapsed:
+                        frame._expanded_height = frame.frame.height()
+                    else:
+                        # 遅延コンテンツを生成してから展開後の高さを測る
+                        frame._loadContent()
+                        frame._expanded_height = frame._expandedHeight()
+                # フレームごとの toggled は止め、最後にグループの toggled を一度だけ送る
+                blocked = frame.blockSignals(True)
+                try:
+                    frame.setCollapsed(collapsed)
+                finally:
+                    frame.blockSignals(blocked)
+                if self._is_animation_enabled:
+                    # 折りたたむ側はアニメーション終了まで表示したままにする
+                    frame.frame.setVisible(True)
+                    frame._applyProgress(start_progress)
+                    self._animated_frames.append((frame, start_progress, 0.0 if collapsed else 1.0))
+        finally:
+            for parent in parents:
+                parent.setUpdatesEnabled(True)
+        
+        if self._animated_frames:
+            self._animation.start()
+        
+        self.toggled.emit([self._frames.index(frame) for frame in changed if frame in self._frames])
+
+    def _updateAnimation(self, value):
+        """共通アニメーションの進行度を各フレームに反映"""
+        for frame, start_progress, end_progress in self._animated_frames:
+            frame._applyProgress(start_progress + (end_progress - start_progress) * value)
+
+    def _finishAnimation(self):
+        """共通アニメーションを終了し、フレームを最終状態にする"""
+        if self._animation.state() == QtCore.QAbstractAnimation.Running:
+            self._animation.stop()
+        for frame, start_progress, end_progress in self._animated_frames:
+            frame._applyProgress(end_progress)
+            frame._finishProgress()
+        self._animated_frames = []
+
+    def _forgetFrame(self, frame):
+        """フレームをグループとアニメーションの対象から外す"""
+        if frame in self._frames:
+            self._frames.remove(frame)
+        self._animated_frames = [entry for entry in self._animated_frames if entry[0] is not frame]
+        
+    def _onFrameToggled(self, collapsed):
+        """排他モードでフレームが展開されたら他を折りたたむ"""
+        if collapsed or not self._is_exclusive:
+            return
+        frame = self.sender()
+        self._apply(dict((other, True) for other in self._frames if other is not frame))
+
+# ----------------------------------------------------------------------------------
+# 仮想化された折りたたみセクションビュー
+# ----------------------------------------------------------------------------------
+class _SectionOffsets(object):
+    """セクションの高さ (間隔を含む) の累積和を Fenwick 木で保持する
+    1 行の高さの変更と、位置・行の検索を O(log n) で行う (作り直しは O(n))
+    """
+    def __init__(self, heights=()):
+        self.reset(heights)
+    
+    def __len__(self):
+        return len(self._tree) - 1
+    
+    def reset(self, heights):
+        """行ごとの高さから作り直す"""
+        tree = [0]
+        tree.extend(heights)
+        count = len(tree) - 1
+        for index in range(1, count + 1):
+            parent = index + (index & -index)
+            if parent <= count:
+                tree[parent] += tree[index]
+        self._tree = tree
+        self._total = self.offset(count)
+    
+    def total(self):
+        """全体の高さ"""
+        return self._total
+    
+    def add(self, row, delta):
+        """row 行目の高さを delta だけ変える"""
+        self._total += delta
+        tree = self._tree
+        index = row + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+    
+    def offset(self, row):
+        """row 行目の上端の位置 (それより前の行の高さの合計)"""
+        tree = self._tree
+        total = 0
+        while row > 0:
+            total += tree[row]
+            row -= row & -row
+        return total
+    
+    def rowAt(self, y):
+        """上端が y 以下の最後の行 (y が全体の高さ以上の場合は行数)"""
+        tree = self._tree
+        count = len(tree) - 1
+        row = 0
+        step = 1 << count.bit_length()
+        while step:
+            index = row + step
+            if index <= count and tree[index] <= y:
+                row = index
+                y -= tree[index]
+            step >>= 1
+        return row
+
+class CollapsibleSectionView(QtWidgets.QAbstractScrollArea):
+    """モデルの各行を CollapsibleFrame と同じ見た目のセクションとして表示するビュー
+    表示領域内のセクションだけに CollapsibleFrame を割り当て、スクロール時に再利用する
+    """
+    toggled = QtCore.Signal(int, bool)  # (行, 折りたたみ状態)
+    
+    def __init__(self, parent=None):
+        super(CollapsibleSectionView, self).__init__(parent)
+        self._model             = None
+        self._collapsed         = []    # 行ごとの折りたたみ状態
+        self._content_heights   = []    # 行ごとのコンテンツの高さ
+        self._offsets           = _SectionOffsets()    # 行ごとの上端の位置
+        self._content_height    = 100
+        self._title_bar_height  = 20
+        self._spacing           = 0
+        self._create_content    = None
+        self._bind_content      = None
+        self._frame_settings    = {}    # 生成するフレームに適用する設定 {メソッド名: 値}
+        self._visible_frames    = {}    # 行: 表示中のフレーム
+        self._frame_rows        = {}    # 表示中のフレーム: 行
+        self._frame_contents    = {}    # フレーム: コンテンツ
+        self._pool              = []    # 再利用を待つフレーム
+        self._is_binding        = False
+        
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(20)
+
+    # override method
+    def resizeEvent(self, event):
+        super(CollapsibleSectionView, self).resizeEvent(event)
+        self._updateScrollBar()
+        self._updateVisibleSections()
+
+    def scrollContentsBy(self, dx, dy):
+        """ビューポートのスクロールはせず、表示するセクションを割り当て直す"""
+        self._updateVisibleSections()
+
+    # public method
+    def model(self):
+        return self._model
+    
+    def contentHeight(self):
+        """コンテンツ領域の既定の高さを返す
+
+        Returns:
+            int: 高さ
+        """
+        return self._content_height
+    
+    def titleBarHeight(self):
+        """タイトルバーの高さを返す
+
+        Returns:
+            int: タイトルバーの高さ
+        """
+        return self._title_bar_height
+    
+    def spacing(self):
+        """セクション間の間隔を返す
+
+        Returns:
+            int: 間隔
+        """
+        return self._spacing
+    
+    def isSectionCollapsed(self, row):
+        """セクションが折りたたまれているかどうか
+
+        Returns:
+            bool: 折りたたみ状態
+        """
+        return self._collapsed[row]
+    
+    def sectionRect(self, row):
+        """セクションのビューポート上の矩形を返す
+
+        Returns:
+            QtCore.QRect: セクションの矩形
+        """
+        top = self._offsets.offset(row) - self.verticalScrollBar().value()
+        return QtCore.QRect(0, top, self.viewport().width(), self._sectionHeight(row))
+    
+    def setModel(self, model):
+        """セクションの元になるモデルを設定 (各行の DisplayRole がタイトルになる)
+
+        Args:
+            model (QtCore.QAbstractItemModel): モデル
+        """
+        if self._model is not None:
+            self._model.modelReset.disconnect(self._reset)
+            self._model.layoutChanged.disconnect(self._reset)
+            self._model.rowsMoved.disconnect(self._reset)
+            self._model.rowsInserted.disconnect(self._onRowsInserted)
+            self._model.rowsRemoved.disconnect(self._onRowsRemoved)
+            self._model.dataChanged.disconnect(self._onDataChanged)
+        
+        self._model = model
+        if self._model is not None:
+            self._model.modelReset.connect(self._reset)
+            self._model.layoutChanged.connect(self._reset)
+            self._model.rowsMoved.connect(self._reset)
+            self._model.rowsInserted.connect(self._onRowsInserted)
+            self._model.rowsRemoved.connect(self._onRowsRemoved)
+            self._model.dataChanged.connect(self._onDataChanged)
+        self._reset()
+    
+    def setContentFactory(self, create, bind=None):
+        """セクションのコンテンツを生成・更新する関数を登録
+        create はフレームごとに一度だけ呼ばれ、bind は割り当てる行が変わるたびに呼ばれる
+
+        Args:
+            create (callable): QWidget を返す関数
+            bind (callable): (QWidget, QtCore.QModelIndex) を受け取りコンテンツを更新する関数
+        """
+        self._create_content = create
+        self._bind_content = bind
+        self._releaseAll(destroy=True)
+        self._updateVisibleSections()
+    
+    def setContentHeight(self, height):
+        """コンテンツ領域の既定の高さを変更 (モデルの SizeHintRole が優先される)"""
+        self._content_height = max(0, height)
+        self._relayout()
+    
+    def setSpacing(self, spacing):
+        """セクション間の間隔を変更"""
+        self._spacing = max(0, spacing)
+        self._relayout()
+    
+    def setSectionCollapsed(self, row, collapsed):
+        """セクションの折りたたみ状態を変更"""
+        if self._collapsed[row] == collapsed:
+            return
+        old_height = self._sectionHeight(row)
+        self._collapsed[row] = collapsed
+        frame = self._visible_frames.get(row)
+        if frame is not None:
+            self._is_binding = True
+            frame.setCollapsed(collapsed)
+            self._is_binding = False
+        self._shiftOffsets(row, old_height)
+        self._updateScrollBar()
+        self._updateVisibleSections()
+        self.toggled.emit(row, collapsed)
+    
+    def setTitleColor(self, color):
+        self._setFrameSetting("setTitleColor", color)
+    
+    def setTitleAlignment(self, alignment):
+        self._setFrameSetting("setTitleAlignment", alignment)
+    
+    def setTitleBarColor(self, color):
+        self._setFrameSetting("setTitleBarColor", color)
+    
+    def setTitleBarHeight(self, height):
+        self._title_bar_height = max(15, height)
+        self._setFrameSetting("setTitleBarHeight", self._title_bar_height)
+        self._relayout()
+    
+    def setIconColor(self, color):
+        self._setFrameSetting("setIconColor", color)
+    
+    def setIconAlignment(self, alignment):
+        self._setFrameSetting("setIconAlignment", alignment)
+    
+    def setIconStyle(self, style):
+        self._setFrameSetting("setIconStyle", style)
+    
+    def setFrameStyle(self, style):
+        self._setFrameSetting("setFrameStyle", style)
+    
+    def scrollToSection(self, row):
+        """セクションが表示されるようにスクロール"""
+        self.verticalScrollBar().setValue(self._offsets.offset(row))
+    
+    # private method
+    def _setFrameSetting(self, name, value):
+        """フレームの設定を保存し、生成済みのフレームすべてに適用"""
+        self._frame_settings[name] = value
+        for frame in list(self._visible_frames.values()) + self._pool:
+            getattr(frame, name)(value)
+    
+    def _rowContentHeight(self, row):
+        """モデルから行のコンテンツの高さを取得 (SizeHintRole が無ければ既定値)"""
+        size = self._model.data(self._model.index(row, 0), QtCore.Qt.SizeHintRole)
+        if isinstance(size, QtCore.QSize) and size.isValid():
+            return size.height()
+        return None
+    
+    def _sectionHeight(self, row):
+        """セクションの高さ (タイトルバー + 展開時のコンテンツ)"""
+        if self._collapsed[row]:
+            return self._title_bar_height
+        
+        height = self._content_heights[row]
+        if height is None:
+            height = self._content_height
+        return self._title_bar_height + height
+    
+    def _shiftOffsets(self, row, old_height):
+        """row 行目の高さの変化分だけ、以降のセクションの位置をずらす"""
+        delta = self._sectionHeight(row) - old_height
+        if delta:
+            self._offsets.add(row, delta)
+    
+    def _updateScrollBar(self):
+        height = self.viewport().height()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setPageStep(height)
+        scroll_bar.setRange(0, max(0, self._offsets.total() - height))
+    
+    def _relayout(self):
+        """すべての行の位置を再計算して表示を更新"""
+        self._offsets.reset(self._sectionHeight(row) + self._spacing for row in range(len(self._collapsed)))
+        self._updateScrollBar()
+        self._updateVisibleSections()
+    
+    def _updateVisibleSections(self):
+        """表示領域内のセクションにだけフレームを割り当てる"""
+        top = self.verticalScrollBar().value()
+        bottom = top + self.viewport().height()
+        width = self.viewport().width()
+        
+        rows = []
+        row = self._offsets.rowAt(top)
+        offsets = []
+        offset = self._offsets.offset(row)
+        while row < len(self._collapsed) and offset < bottom:
+            rows.append(row)
+            offsets.append(offset)
+            offset += self._sectionHeight(row) + self._spacing
+            row += 1
+        
+        # 表示領域から外れたフレームをプールに戻す
+        visible_rows = set(rows)
+        for row in [row for row in self._visible_frames if row not in visible_rows]:
+            self._releaseFrame(row)
+        
+        for row, offset in zip(rows, offsets):
+            frame = self._visible_frames.get(row)
+            if frame is None:
+                frame = self._acquireFrame()
+                self._bindFrame(frame, row)
+            frame.setGeometry(0, offset - top, width, self._sectionHeight(row))
+            frame.show()
+    
+    def _acquireFrame(self):
+        """プールからフレームを取り出す (空の場合は生成)"""
+        if self._pool:
+            return self._pool.pop()
+        
+        frame = CollapsibleFrame(parent=self.viewport())
+        frame.setAnimationEnabled(False)
+        for name, value in self._frame_settings.items():
+            getattr(frame, name)(value)
+        if self._create_content is not None:
+            content = self._create_content()
+            frame.addWidget(content)
+            self._frame_contents[frame] = content
+        frame.toggled.connect(lambda collapsed, frame=frame: self._onFrameToggled(frame, collapsed))
+        return frame
+    
+    def _bindFrame(self, frame, row):
+        """フレームに行の内容を反映"""
+        index = self._model.index(row, 0)
+        self._is_binding = True
+        frame.setTitle(self._model.data(index, QtCore.Qt.DisplayRole) or "")
+        frame.setCollapsed(self._collapsed[row])
+        self._is_binding = False
+        if self._bind_content is not None and frame in self._frame_contents:
+            self._bind_content(self._frame_contents[frame], index)
+        self._visible_frames[row] = frame
+        self._frame_rows[frame] = row
+    
+    def _releaseFrame(self, row):
+        """フレームを非表示にしてプールに戻す"""
+        frame = self._visible_frames.pop(row)
+        self._frame_rows.pop(frame, None)
+        frame.hide()
+        self._pool.append(frame)
+    
+    def _releaseAll(self, destroy=False):
+        """すべてのフレームをプールに戻す (destroy の場合は破棄)"""
+        for row in list(self._visible_frames):
+            self._releaseFrame(row)
+        if destroy:
+            for frame in self._pool:
+                self._frame_contents.pop(frame, None)
+                frame.deleteLater()
+            self._pool = []
+    
+    def _reset(self):
+        """モデル全体が変わったときに状態を作り直す"""
+        self._releaseAll()
+        count = self._model.rowCount() if self._model is not None else 0
+        self._collapsed = [False] * count
+        self._content_heights = [self._rowContentHeight(row) for row in range(count)]
+        self._relayout()
+    
+    def _onRowsInserted(self, parent, first, last):
+        if parent.isValid():
+            return
+        self._collapsed[first:first] = [False] * (last - first + 1)
+        self._content_heights[first:first] = [self._rowContentHeight(row) for row in range(first, last + 1)]
+        self._releaseAll()
+        self._relayout()
+    
+    def _onRowsRemoved(self, parent, first, last):
+        if parent.isValid():
+            return
+        del self._collapsed[first:last + 1]
+        del self._content_heights[first:last + 1]
+        self._releaseAll()
+        self._relayout()
+    
+    def _onDataChanged(self, top_left, bottom_right, roles=()):
+        # 表示中の行だけ再割り当てし、高さが変わった行の分だけ以降の位置をずらす
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            old_height = self._sectionHeight(row)
+            self._content_heights[row] = self._rowContentHeight(row)
+            self._shiftOffsets(row, old_height)
+            if row in self._visible_frames:
+                self._releaseFrame(row)
+        self._updateScrollBar()
+        self._updateVisibleSections()
+    
+    def _onFrameToggled(self, frame, collapsed):
+        """ユーザー操作でフレームが開閉されたときに位置を再計算"""
+        if self._is_binding or frame not in self._frame_rows:
+            return
+        row = self._frame_rows[frame]
+        old_height = self._sectionHeight(row)
+        self._collapsed[row] = collapsed
+        self._shiftOffsets(row, old_height)
+        self._updateScrollBar()
+        self._updateVisibleSections()
+        self.toggled.emit(row, collapsed)
+
+# ----------------------------------------------------------------------------------
+# カラーラベル
+# ----------------------------------------------------------------------------------
+class ColorLabel(QtWidgets.QWidget):
+    def __init__(self, text, color=QtGui.QColor(255, 0, 0), parent=None):
+        super(ColorLabel, self).__init__(parent)
+        self._text          = text
+        self._text_color    = QtGui.QColor(187, 187, 187)
+        self._icon_size     = 10
+        self._icon_color    = color
+        self._margin        = 10
+        self._font          = None  # setTextSize されるまではウィジェットのフォントを使う
+        self._static_text   = StaticText(self._labelFont(), self.devicePixelRatioF())
+        self.setSizePolicy(QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum)
+
+    # override method
+    def sizeHint(self):
+        text_width, text_height = get_text_metrics().size(self._labelFont(), self._text)
+        return QtCore.QSize(self._icon_size + self._margin + text_width, max(self._icon_size, text_height))
+        
+    def event(self, event):
+        if event.type() in StaticText.kDeviceEvents:
+            self._static_text.setFont(self._labelFont(), self.devicePixelRatioF())
+        return super(ColorLabel, self).event(event)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        
+        # カラー矩形描画
+        rect = QtCore.QRect(0, (self.height() - self._icon_size) // 2, self._icon_size, self._icon_size)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(self._icon_color)
+        painter.drawRect(rect)      
+        
+        # テキスト描画
+        painter.setFont(self._labelFont())
+        text_x = self._icon_size + self._margin
+        text_rect = QtCore.QRect(text_x, 0, self.width(), self.height())
+        painter.setPen(self._text_color)
+        self._static_text.draw(painter, text_rect, QtCore.Qt.AlignVCenter, self._text)
 
     # public method
     def text(self):
         return self._text
     
     def textSize(self):
-        return self.font.pointSize()
+        return self._labelFont().pointSize()
     
     def textColor(self):
         return self._text_color
@@ -577,9 +1725,263 @@ class ColorLabel(QtWidgets.QWidget):
         self.update()
     
     def setTextSize(self, size):
-        self._font.setPointSize(size)
-        self.updateGeometry()
-        self.update()
+        font = QtGui.QFont(self._labelFont())
+        font.setPointSize(size)
+        self._font = font
+        self._static_text.setFont(font, self.devicePixelRatioF())
+        self.updateGeometry()
+        self.update()
+    
+    def setTextColor(self, color):
+        self._text_color = color
+        self.update()
+    
+    def setIconSize(self, size):
+        self._icon_size = size
+        self.updateGeometry()
+        self.update()
+        
+    def setIconColor(self, color):
+        self._icon_color = color
+        self.update()
+    
+    def setMargin(self, margin):
+        self._margin = margin
+        self.updateGeometry()
+        self.update()
+
+    # private method
+    def _labelFont(self):
+        return self._font if self._font is not None else self.font()
+
+# ----------------------------------------------------------------------------------
+# カラー凡例
+# ----------------------------------------------------------------------------------
+class ColorLegend(QtWidgets.QWidget):
+    """複数の ColorLabel 相当の項目を一つのウィジェットで描画する凡例
+    項目は (テキスト, 色) のリストとして保持し、同じ大きさのセルに並べる
+    """
+    entryClicked = QtCore.Signal(int)   # クリックされた項目のインデックス
+    entryHovered = QtCore.Signal(int)   # ホバー中の項目のインデックス (無い場合は -1)
+    
+    kLeftToRight    = 0
+    kTopToBottom    = 1
+    
+    def __init__(self, parent=None):
+        super(ColorLegend, self).__init__(parent)
+        self._texts         = []
+        self._colors        = []
+        self._text_color    = QtGui.QColor(187, 187, 187)
+        self._icon_size     = 10
+        self._margin        = 10
+        self._spacing       = 10
+        self._flow          = self.kLeftToRight
+        self._font          = None  # setTextSize されるまではウィジェットのフォントを使う
+        self._text_width    = 0     # 最も長いテキストの幅
+        self._hovered       = -1
+        
+        self.setMouseTracking(True)
+        size_policy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
+        size_policy.setHeightForWidth(True)
+        self.setSizePolicy(size_policy)
+
+    # override method
+    def hasHeightForWidth(self):
+        return True
+    
+    def heightForWidth(self, width):
+        columns, rows = self._gridSize(width)
+        return rows * self._cellHeight() + max(0, rows - 1) * self._spacing
+    
+    def sizeHint(self):
+        # 最大 4 列分の幅を推奨サイズにする
+        width = min(len(self._texts), 4) * (self._cellWidth() + self._spacing) - self._spacing
+        width = max(width, self._cellWidth())
+        return QtCore.QSize(width, self.heightForWidth(width))
+    
+    def minimumSizeHint(self):
+        return QtCore.QSize(self._cellWidth(), self._cellHeight())
+    
+    def paintEvent(self, event):
+        """露出した領域に含まれる項目だけを一度に描画"""
+        if not self._texts:
+            return
+        
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setFont(self._labelFont())
+        painter.setClipRegion(event.region())
+        
+        cell_width = self._cellWidth()
+        cell_height = self._cellHeight()
+        columns, rows = self._gridSize(self.width())
+        exposed = event.rect()
+        first_row = max(0, exposed.top() // (cell_height + self._spacing))
+        last_row = min(rows - 1, exposed.bottom() // (cell_height + self._spacing))
+        first_column = max(0, exposed.left() // (cell_width + self._spacing))
+        last_column = min(columns - 1, exposed.right() // (cell_width + self._spacing))
+        
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                index = self._indexAt(row, column, columns, rows)
+                if index < 0:
+                    continue
+                x = column * (cell_width + self._spacing)
+                y = row * (cell_height + self._spacing)
+                
+                # カラー矩形描画
+                painter.setPen(QtCore.Qt.NoPen)
+                painter.setBrush(self._colors[index])
+                painter.drawRect(QtCore.QRect(x, y + (cell_height - self._icon_size) // 2, self._icon_size, self._icon_size))
+                
+                # テキスト描画
+                painter.setPen(self._text_color)
+                text_x = x + self._icon_size + self._margin
+                painter.drawText(QtCore.QRect(text_x, y, cell_width - self._icon_size - self._margin, cell_height), QtCore.Qt.AlignVCenter, self._texts[index])
+    
+    def mouseMoveEvent(self, event):
+        index = self.entryAt(event.pos())
+        if index != self._hovered:
+            self._hovered = index
+            self.setToolTip(self._texts[index] if index >= 0 else "")
+            self.entryHovered.emit(index)
+        super(ColorLegend, self).mouseMoveEvent(event)
+    
+    def leaveEvent(self, event):
+        if self._hovered != -1:
+            self._hovered = -1
+            self.entryHovered.emit(-1)
+        super(ColorLegend, self).leaveEvent(event)
+    
+    def mouseReleaseEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            index = self.entryAt(event.pos())
+            if index >= 0:
+                self.entryClicked.emit(index)
+        super(ColorLegend, self).mouseReleaseEvent(event)
+    
+    def changeEvent(self, event):
+        if event.type() == QtCore.QEvent.FontChange:
+            self._updateTextWidth()
+        super(ColorLegend, self).changeEvent(event)
+
+    # public method
+    def count(self):
+        return len(self._texts)
+    
+    def text(self, index):
+        return self._texts[index]
+    
+    def color(self, index):
+        return self._colors[index]
+    
+    def textSize(self):
+        return self._labelFont().pointSize()
+    
+    def textColor(self):
+        return self._text_color
+    
+    def iconSize(self):
+        return self._icon_size
+    
+    def margin(self):
+        return self._margin
+    
+    def spacing(self):
+        return self._spacing
+    
+    def flow(self):
+        """項目を並べる方向を返す
+
+        Returns:
+            int: kLeftToRight = 0 kTopToBottom = 1
+        """
+        return self._flow
+    
+    def entryAt(self, pos):
+        """座標にある項目のインデックスを返す
+
+        Args:
+            pos (QtCore.QPoint): ウィジェット上の座標
+
+        Returns:
+            int: インデックス (無い場合は -1)
+        """
+        if pos.x() < 0 or pos.y() < 0:
+            return -1
+        cell_width = self._cellWidth()
+        cell_height = self._cellHeight()
+        column, x = divmod(pos.x(), cell_width + self._spacing)
+        row, y = divmod(pos.y(), cell_height + self._spacing)
+        if x >= cell_width or y >= cell_height:
+            return -1
+        columns, rows = self._gridSize(self.width())
+        if column >= columns or row >= rows:
+            return -1
+        return self._indexAt(row, column, columns, rows)
+    
+    def entryRect(self, index):
+        """項目の矩形を返す
+
+        Returns:
+            QtCore.QRect: 矩形
+        """
+        columns, rows = self._gridSize(self.width())
+        if self._flow == self.kLeftToRight:
+            row, column = divmod(index, columns)
+        else:
+            column, row = divmod(index, rows)
+        cell_width = self._cellWidth()
+        cell_height = self._cellHeight()
+        return QtCore.QRect(column * (cell_width + self._spacing), row * (cell_height + self._spacing), cell_width, cell_height)
+    
+    def addEntry(self, text, color):
+        """項目を追加"""
+        self._texts.append(text)
+        self._colors.append(color)
+        width = get_text_metrics().horizontalAdvance(self._labelFont(), text)
+        if width > self._text_width:
+            self._text_width = width
+        self._updateLayout()
+    
+    def setEntries(self, entries):
+        """項目をまとめて設定
+
+        Args:
+            entries (list): [(テキスト, QtGui.QColor), ...]
+        """
+        self._texts = [text for text, color in entries]
+        self._colors = [color for text, color in entries]
+        self._updateTextWidth()
+    
+    def removeEntry(self, index):
+        """項目を削除"""
+        text = self._texts.pop(index)
+        self._colors.pop(index)
+        if get_text_metrics().horizontalAdvance(self._labelFont(), text) >= self._text_width:
+            self._updateTextWidth()
+        else:
+            self._updateLayout()
+    
+    def clear(self):
+        self._texts = []
+        self._colors = []
+        self._text_width = 0
+        self._updateLayout()
+    
+    def setText(self, index, text):
+        self._texts[index] = text
+        self._updateTextWidth()
+    
+    def setColor(self, index, color):
+        self._colors[index] = color
+        self.update(self.entryRect(index))
+    
+    def setTextSize(self, size):
+        font = QtGui.QFont(self._labelFont())
+        font.setPointSize(size)
+        self._font = font
+        self._updateTextWidth()
     
     def setTextColor(self, color):
         self._text_color = color
@@ -587,33 +1989,382 @@ class ColorLabel(QtWidgets.QWidget):
     
     def setIconSize(self, size):
         self._icon_size = size
-        self.updateGeometry()
-        self.update()
-        
-    def setIconColor(self, color):
-        self._icon_color = color
-        self.update()
+        self._updateLayout()
     
     def setMargin(self, margin):
         self._margin = margin
+        self._updateLayout()
+    
+    def setSpacing(self, spacing):
+        self._spacing = spacing
+        self._updateLayout()
+    
+    def setFlow(self, flow):
+        """項目を並べる方向を変更 (0: kLeftToRight, 1: kTopToBottom)"""
+        if flow in [self.kLeftToRight, self.kTopToBottom]:
+            self._flow = flow
+            self.update()
+
+    # private method
+    def _labelFont(self):
+        return self._font if self._font is not None else self.font()
+    
+    def _cellWidth(self):
+        return self._icon_size + self._margin + self._text_width
+    
+    def _cellHeight(self):
+        return max(self._icon_size, get_text_metrics().height(self._labelFont()))
+    
+    def _gridSize(self, width):
+        """幅に収まる列数と行数を返す"""
+        count = len(self._texts)
+        if not count:
+            return 1, 0
+        columns = max(1, (width + self._spacing) // (self._cellWidth() + self._spacing))
+        columns = min(columns, count)
+        rows = (count + columns - 1) // columns
+        return columns, rows
+    
+    def _indexAt(self, row, column, columns, rows):
+        """セルの位置から項目のインデックスを返す (無い場合は -1)"""
+        if self._flow == self.kLeftToRight:
+            index = row * columns + column
+        else:
+            index = column * rows + row
+        return index if index < len(self._texts) else -1
+    
+    def _updateTextWidth(self):
+        """最も長いテキストの幅を計測し直す"""
+        font = self._labelFont()
+        metrics = get_text_metrics()
+        self._text_width = max([metrics.horizontalAdvance(font, text) for text in self._texts] or [0])
+        self._updateLayout()
+    
+    def _updateLayout(self):
         self.updateGeometry()
         self.update()
 
 # ----------------------------------------------------------------------------------
 # フローレイアウト
 # ----------------------------------------------------------------------------------
-class FlowLayout(QtWidgets.QLayout):
+class _FlowGeometry(object):
+    """FlowLayout の幅ごとの配置結果 (座標はレイアウト矩形の左上からの相対位置)"""
+    def __init__(self, width):
+        self.width  = width
+        self.rects  = []    # アイテムごとの (x, y, width, height)
+        self.xs     = []    # アイテムごとの x 座標 (行の中の二分探索用)
+        self.height = 0
+        self.cursor = 0     # 最後のアイテムの右側の x 座標 (次に追加するアイテムの位置)
+        
+        # 行ごとの情報
+        self.row_starts  = []   # 先頭のアイテムのインデックス
+        self.row_tops    = []   # y 座標
+        self.row_heights = []   # 高さ
+
+    def snapshot(self):
+        """部分的な再配置の前の状態を複製"""
+        old = _FlowGeometry(self.width)
+        old.rects = self.rects[:]
+        old.xs = self.xs[:]
+        old.height = self.height
+        old.cursor = self.cursor
+        old.row_starts = self.row_starts[:]
+        old.row_tops = self.row_tops[:]
+        old.row_heights = self.row_heights[:]
+        return old
+
+    def indexAt(self, x, y):
+        """座標にあるアイテムのインデックス (無い場合は -1)"""
+        row = bisect.bisect_right(self.row_tops, y) - 1
+        if row < 0 or y >= self.row_tops[row] + self.row_heights[row]:
+            return -1
+        start, stop = self._rowRange(row)
+        index = bisect.bisect_right(self.xs, x, start, stop) - 1
+        if index < start:
+            return -1
+        item_x, item_y, width, height = self.rects[index]
+        if x < item_x + width and y < item_y + height:
+            return index
+        return -1
+
+    def indexesIn(self, left, top, right, bottom):
+        """矩形 (right, bottom は含まない) と重なるアイテムのインデックス"""
+        indexes = []
+        row = max(bisect.bisect_right(self.row_tops, top) - 1, 0)
+        last_row = bisect.bisect_left(self.row_tops, bottom)
+        rects = self.rects
+        for row in range(row, last_row):
+            if self.row_tops[row] + self.row_heights[row] <= top:
+                continue
+            start, stop = self._rowRange(row)
+            first = max(bisect.bisect_right(self.xs, left, start, stop) - 1, start)
+            last = bisect.bisect_left(self.xs, right, start, stop)
+            for index in range(first, last):
+                item_x, item_y, width, height = rects[index]
+                if item_x + width > left and item_y + height > top:
+                    indexes.append(index)
+        return indexes
+
+    def _rowRange(self, row):
+        """行のアイテムのインデックスの範囲"""
+        stop = self.row_starts[row + 1] if row + 1 < len(self.row_starts) else len(self.rects)
+        return self.row_starts[row], stop
+
+class _UniformFlowGeometry(object):
+    """すべてのアイテムが同じサイズのときの FlowLayout の配置結果
+    列数と行の間隔だけを持ち、アイテムの位置や全体の高さは計算で求める
+    """
+    def __init__(self, width, count, item_width, item_height, spacing, vertical_spacing):
+        self.width          = width
+        self.count          = count
+        self.item_width     = item_width
+        self.item_height    = item_height
+        self.step_x         = item_width + spacing
+        self.step_y         = item_height + vertical_spacing
+        self.top            = 0
+        
+        # FlowLayout と同じく x + 幅 > width - 1 で折り返す
+        right = width - 1
+        if item_width > right:
+            # 先頭のアイテムも折り返すため、空の行の分だけ下がり 1 列になる
+            self.columns = 1
+            self.top = vertical_spacing
+        elif self.step_x <= 0:
+            self.columns = max(count, 1)
+        else:
+            self.columns = (right - item_width) // self.step_x + 1
+        
+        rows = -(-count // self.columns)
+        self.height = self.top + rows * self.step_y - vertical_spacing if count else 0
+
+    def sameGrid(self, other):
+        """other と同じ格子 (アイテム数を除く) ならアイテムの位置も同じ"""
+        return (isinstance(other, _UniformFlowGeometry) and self.columns == other.columns and self.top == other.top
+                and self.step_x == other.step_x and self.step_y == other.step_y
+                and self.item_width == other.item_width and self.item_height == other.item_height)
+
+    @property
+    def rects(self):
+        return [self.rect(index) for index in range(self.count)]
+
+    def rect(self, index):
+        """アイテムの (x, y, width, height)"""
+        row, column = divmod(index, self.columns)
+        return (column * self.step_x, self.top + row * self.step_y, self.item_width, self.item_height)
+
+    def indexAt(self, x, y):
+        """座標にあるアイテムのインデックス (無い場合は -1)"""
+        if x < 0 or y < self.top or self.step_x <= 0 or self.step_y <= 0:
+            return -1
+        row, offset_y = divmod(y - self.top, self.step_y)
+        column, offset_x = divmod(x, self.step_x)
+        if offset_y >= self.item_height or offset_x >= self.item_width or column >= self.columns:
+            return -1
+        index = row * self.columns + column
+        return index if index < self.count else -1
+
+    def indexesIn(self, left, top, right, bottom):
+        """矩形 (right, bottom は含まない) と重なるアイテムのインデックス"""
+        if self.step_x <= 0 or self.step_y <= 0:
+            return [index for index in range(self.count) if self._intersects(index, left, top, right, bottom)]
+        
+        # 左上・右下のセルから行と列の範囲を求める (セルの間の隙間は含まない)
+        first_row = max((top - self.top - self.item_height) // self.step_y + 1, 0)
+        last_row = (bottom - 1 - self.top) // self.step_y
+        first_column = max((left - self.item_width) // self.step_x + 1, 0)
+        last_column = min((right - 1) // self.step_x, self.columns - 1)
+        
+        indexes = []
+        for row in range(first_row, last_row + 1):
+            base = row * self.columns
+            if base >= self.count:
+                break
+            indexes.extend(range(base + first_column, min(base + last_column + 1, self.count)))
+        return indexes
+
+    def _intersects(self, index, left, top, right, bottom):
+        x, y, width, height = self.rect(index)
+        return x < right and x + width > left and y < bottom and y + height > top
+
+class _FlowArrangement(object):
+    """FlowLayout と FlowView に共通の、アイテムのサイズから行の折り返しと位置を計算する処理
+    継承先は _widths, _heights (アイテムごとのサイズ), _vertical_spacing と spacing() を持つ
+    """
+    def _computeGeometry(self, width):
+        """アイテムの行の折り返しと位置を計算
+
+        Args:
+            width (int): レイアウトの幅
+
+        Returns:
+            _FlowGeometry: 配置結果
+        """
+        geometry = _FlowGeometry(width)
+        self._flow(geometry, 0, 0, 0, 0, False)
+        return geometry
+
+    def _flow(self, geometry, index, x, y, row_height, new_row, old=None, edit=0, delta=0):
+        """index 番目のアイテムから順に配置結果に追加する
+        old を指定した場合、編集位置より後で old と行の区切りが一致した時点で
+        残りの行は old の結果をずらして再利用する
+
+        Args:
+            geometry (_FlowGeometry): 追加する配置結果
+            index (int): 配置を始めるアイテム
+            x (int): 配置を始める x 座標
+            y (int): 配置を始める行の y 座標
+            row_height (int): 配置を始める行のそれまでの高さ
+            new_row (bool): index 番目のアイテムが折り返し済みの行の先頭になる
+            old (_FlowGeometry): 編集前の配置結果
+            edit (int): 編集した最後の位置 (これより後のアイテムだけを old と比べる)
+            delta (int): アイテム数の増減
+
+        Returns:
+            tuple: (配置を打ち切ったインデックス, old から再利用した行の y 座標のずれ)
+        """
+        widths = self._widths
+        heights = self._heights
+        count = len(widths)
+        right = geometry.width - 1
+        spacing = self.spacing()
+        rects = geometry.rects
+        xs = geometry.xs
+        row_starts = geometry.row_starts
+        row_tops = geometry.row_tops
+        row_heights = geometry.row_heights
+        
+        while index < count:
+            item_width = widths[index]
+            item_height = heights[index]
+            if not new_row and x + item_width > right:
+                x = 0
+                y += row_height + self._vertical_spacing
+                row_height = 0
+                new_row = True
+                
+                if old is not None and index > edit:
+                    shift = self._reuseRows(geometry, old, index, y, delta)
+                    if shift is not None:
+                        return index, shift
+                
+            if new_row or not row_starts:
+                row_starts.append(index)
+                row_tops.append(y)
+                row_heights.append(0)
+                new_row = False
+                
+            rects.append((x, y, item_width, item_height))
+            xs.append(x)
+            x += item_width + spacing
+            row_height = max(row_height, item_height)
+            row_heights[-1] = row_height
+            index += 1
+        
+        geometry.cursor = x
+        geometry.height = y + row_height if row_starts else 0
+        return count, 0
+
+    def _reuseRows(self, geometry, old, index, y, delta):
+        """編集前に index - delta 番目のアイテムから始まる行があれば、以降の行を再利用する
+
+        Returns:
+            int: 再利用した行の y 座標のずれ (再利用できない場合は None)
+        """
+        old_index = index - delta
+        row = bisect.bisect_left(old.row_starts, old_index)
+        if row == len(old.row_starts) or old.row_starts[row] != old_index:
+            return None
+        
+        shift = y - old.row_tops[row]
+        if shift:
+            geometry.rects.extend((x, top + shift, width, height) for x, top, width, height in old.rects[old_index:])
+        else:
+            geometry.rects.extend(old.rects[old_index:])
+        geometry.xs.extend(old.xs[old_index:])
+        geometry.row_starts.extend(start + delta for start in old.row_starts[row:])
+        geometry.row_tops.extend(top + shift for top in old.row_tops[row:])
+        geometry.row_heights.extend(old.row_heights[row:])
+        geometry.cursor = old.cursor
+        geometry.height = old.height + shift
+        return shift
+
+    def _reflowGeometry(self, geometry, index, delta, last):
+        """挿入・削除・サイズの変更に合わせて配置結果を部分的に更新
+        index を含む行 (行の先頭の場合は前の行) から配置し直し、行の区切りが元に戻ったところで打ち切る
+
+        Args:
+            geometry (_FlowGeometry): 更新する配置結果
+            index (int): 編集した最初の位置
+            delta (int): アイテム数の増減 (挿入は 1、削除は -1、サイズの変更は 0)
+            last (int): 編集した最後の位置 (削除の場合は index - 1)
+
+        Returns:
+            tuple: 位置が変わったアイテムの範囲 (start, stop)
+        """
+        count = len(self._widths)
+        # 末尾への追加は最後の行の続きに置くだけ
+        if delta > 0 and index == count - 1 and geometry.row_starts:
+            self._flow(geometry, index, geometry.cursor, geometry.row_tops[-1], geometry.row_heights[-1], False)
+            return index, count
+        
+        old = geometry.snapshot()
+        row = max(bisect.bisect_right(old.row_starts, index) - 1, 0)
+        if row > 0 and old.row_starts[row] == index:
+            row -= 1
+        start = old.row_starts[row] if old.row_starts else 0
+        
+        del geometry.rects[start:]
+        del geometry.xs[start:]
+        del geometry.row_starts[row:]
+        del geometry.row_tops[row:]
+        del geometry.row_heights[row:]
+        if start == 0:
+            stop, shift = self._flow(geometry, 0, 0, 0, 0, False, old, last, delta)
+        else:
+            stop, shift = self._flow(geometry, start, 0, old.row_tops[row], 0, True, old, last, delta)
+        
+        if shift:
+            stop = count
+        return start, stop
+
+class FlowLayout(_FlowArrangement, QtWidgets.QLayout):
+    kLayoutCacheSize = 8    # 幅ごとに保持する配置結果の数
+    
     def __init__(self, parent=None):
         super(FlowLayout, self).__init__(parent)
         self._items = []
         self._vertical_spacing = 5
+        self._layout_cache = collections.OrderedDict()  # 幅: _FlowGeometry
+        self._layout_spacing = None                     # 配置結果を計算したときの間隔
+        self._insert_index = None                       # insertWidget で挿入する位置
+        self._batch_depth = 0                           # batchUpdate の入れ子の深さ
+        
+        # 最後に適用した配置結果と、その後の挿入・削除で位置が変わったアイテムの範囲
+        self._applied_rect = None
+        self._applied_geometry = None
+        self._dirty_range = (0, 0)
+        
+        # アイテムごとのサイズのキャッシュ
+        self._widths = array.array("i")
+        self._heights = array.array("i")
+        self._min_widths = array.array("i")
+        self._min_heights = array.array("i")
+        self._min_width = 0             # 最小サイズの幅の最大値
+        self._min_height = 0            # 最小サイズの高さの最大値
+        self._min_width_counts = {}     # 最小サイズの幅: アイテム数
+        self._min_height_counts = {}    # 最小サイズの高さ: アイテム数
+        self._size_counts = {}  # (幅, 高さ): アイテム数 (1 種類だけなら均一な格子として配置する)
+        self._sizes_dirty = False
         
         self.setContentsMargins(0, 0, 0, 0)
         self.setSpacing(5)
             
     # override method
     def addItem(self, item):
-        self._items.append(item)
+        if self._insert_index is None:
+            self.insertItem(len(self._items), item)
+        else:
+            self.insertItem(self._insert_index, item)
         
     def count(self):
         return len(self._items)
@@ -625,34 +2376,134 @@ class FlowLayout(QtWidgets.QLayout):
     
     def takeAt(self, index):
         if 0 <= index < len(self._items):
-            return self._items.pop(index)
+            item = self._items.pop(index)
+            self._removeSize(index)
+            if not self._batch_depth:
+                self._reflow(index, -1)
+                self.update()
+            return item
         return None
 
+    def invalidate(self):
+        """子ウィジェットの updateGeometry などで呼ばれる
+        サイズは次に必要になったときに確認し、変わっていた場合だけ配置結果を破棄する
+        """
+        self._sizes_dirty = True
+        super(FlowLayout, self).invalidate()
+
     def hasHeightForWidth(self):
         return True
     
     def heightForWidth(self, width):
-        height = self._do_layout(QtCore.QRect(0, 0, width, 0))
-        return height
+        return self._geometryFor(width).height
 
     def sizeHint(self):
         return self.minimumSize()
     
     def minimumSize(self):
-        size = QtCore.QSize()
-        
-        for item in self._items:
-            size = size.expandedTo(item.minimumSize())
-            
+        self._refreshSizes()
         margins = self.contentsMargins()
-        size += QtCore.QSize(margins.left() + margins.right(), margins.top() + margins.bottom())
-        return size
+        return QtCore.QSize(self._min_width + margins.left() + margins.right(), self._min_height + margins.top() + margins.bottom())
     
     def setGeometry(self, rect):
         super(FlowLayout, self).setGeometry(rect)
         self._do_layout(rect)
     
     # public method
+    def insertItem(self, index, item):
+        """アイテムを挿入
+
+        Args:
+            index (int): 挿入する位置 (範囲外の場合は末尾)
+            item (QtWidgets.QLayoutItem): アイテム
+        """
+        if not 0 <= index < len(self._items):
+            index = len(self._items)
+        self._items.insert(index, item)
+        self._insertSize(index, item)
+        if not self._batch_depth:
+            self._reflow(index, 1)
+            self.update()
+
+    def addWidgets(self, widgets):
+        """ウィジェットをまとめて追加 (配置と描画は最後に一度だけ行う)
+
+        Args:
+            widgets (iterable): QtWidgets.QWidget
+        """
+        with self.batchUpdate():
+            for widget in widgets:
+                self.addWidget(widget)
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """with ブロックの間は配置と親ウィジェットの描画を止め、抜けたときに一度だけ配置し直す
+
+        with layout.batchUpdate():
+            for widget in widgets:
+                layout.addWidget(widget)
+        """
+        widget = self.parentWidget()
+        outermost = self._batch_depth == 0
+        suspend = outermost and widget is not None and widget.updatesEnabled()
+        if suspend:
+            widget.setUpdatesEnabled(False)
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if outermost:
+                # 途中の _reflow を省いたので、配置結果を破棄して次の activate で一度だけ配置する
+                self._layout_cache.clear()
+                self._applied_geometry = None
+                self.update()
+            if suspend:
+                widget.setUpdatesEnabled(True)
+
+    def insertWidget(self, index, widget):
+        """ウィジェットを挿入
+
+        Args:
+            index (int): 挿入する位置 (範囲外の場合は末尾)
+            widget (QtWidgets.QWidget): ウィジェット
+        """
+        self._insert_index = index
+        try:
+            self.addWidget(widget)
+        finally:
+            self._insert_index = None
+
+    def indexAt(self, point):
+        """位置にあるアイテムのインデックスを返す
+        レイアウト時の行の位置と行内の x 座標を二分探索する
+
+        Args:
+            point (QtCore.QPoint): 親ウィジェット上の位置
+
+        Returns:
+            int: インデックス (アイテムが無い場合は -1)
+        """
+        rect = self.geometry()
+        geometry = self._geometryFor(rect.width())
+        return geometry.indexAt(point.x() - rect.x(), point.y() - rect.y())
+
+    def itemsIn(self, rect):
+        """矩形と重なるアイテムを返す (ラバーバンド選択など)
+
+        Args:
+            rect (QtCore.QRect): 親ウィジェット上の矩形
+
+        Returns:
+            list: QtWidgets.QLayoutItem のリスト
+        """
+        layout_rect = self.geometry()
+        geometry = self._geometryFor(layout_rect.width())
+        left = rect.x() - layout_rect.x()
+        top = rect.y() - layout_rect.y()
+        indexes = geometry.indexesIn(left, top, left + rect.width(), top + rect.height())
+        return [self._items[index] for index in indexes]
+
     def verticalSpacing(self):
         """アイテムの垂直の間隔
 
@@ -668,43 +2519,641 @@ class FlowLayout(QtWidgets.QLayout):
             spacing (int): 間隔
         """        
         self._vertical_spacing = spacing
-        self.update()
+        self._layout_cache.clear()
+        QtWidgets.QLayout.invalidate(self)
     
     # private method
+    def _geometryFor(self, width):
+        """幅に対する配置結果を返す (同じ幅では一度だけ計算する)
+
+        Args:
+            width (int): レイアウトの幅
+
+        Returns:
+            _FlowGeometry: 配置結果
+        """
+        self._refreshSizes()
+        if self._layout_spacing != self.spacing():
+            self._layout_cache.clear()
+            self._layout_spacing = self.spacing()
+        
+        geometry = self._layout_cache.get(width)
+        if geometry is not None:
+            self._layout_cache.move_to_end(width)
+            return geometry
+        
+        geometry = self._computeGeometry(width)
+        self._layout_cache[width] = geometry
+        if len(self._layout_cache) > self.kLayoutCacheSize:
+            self._layout_cache.popitem(last=False)
+        return geometry
+
+    def _computeGeometry(self, width):
+        """アイテムがすべて同じサイズなら計算だけで済む配置結果を返す"""
+        if len(self._size_counts) == 1:
+            (item_width, item_height), = self._size_counts
+            return _UniformFlowGeometry(width, len(self._items), item_width, item_height, self.spacing(), self._vertical_spacing)
+        return super(FlowLayout, self)._computeGeometry(width)
+
+    def _reflow(self, index, delta, last=None):
+        """アイテムの編集の後、適用中の幅の配置結果だけを部分的に更新し、ほかの幅の結果は破棄する
+
+        Args:
+            index (int): 編集した最初の位置
+            delta (int): アイテム数の増減 (挿入は 1、削除は -1、サイズの変更は 0)
+            last (int): 編集した最後の位置 (省略時は挿入・削除した位置)
+        """
+        if last is None:
+            last = index if delta >= 0 else index - 1
+        geometry = self._applied_geometry
+        applied = geometry is not None and self._layout_cache.get(geometry.width) is geometry and not self._sizes_dirty
+        self._layout_cache.clear()
+        if not applied:
+            self._applied_geometry = None
+            return
+        
+        if len(self._size_counts) == 1:
+            # 均一な格子: 配置結果を作り直し、同じ格子のままなら編集位置以降だけ動かす
+            uniform = self._computeGeometry(geometry.width)
+            start, stop = (index if uniform.sameGrid(geometry) else 0), len(self._items)
+            geometry = self._applied_geometry = uniform
+        elif isinstance(geometry, _UniformFlowGeometry):
+            # 違うサイズのアイテムが現れたので通常の配置に戻す
+            self._applied_geometry = None
+            return
+        else:
+            start, stop = self._reflowGeometry(geometry, index, delta, last)
+        self._layout_cache[geometry.width] = geometry
+        
+        # 前回までの範囲を挿入・削除の分だけずらして結合
+        dirty_start, dirty_stop = self._dirty_range
+        if dirty_start < dirty_stop:
+            if dirty_start > index:
+                dirty_start += delta
+            if dirty_stop > index:
+                dirty_stop += delta
+            start = min(start, dirty_start)
+            stop = max(stop, dirty_stop)
+        self._dirty_range = (start, min(stop, len(self._items)))
+
+    def _insertSize(self, index, item):
+        """挿入したアイテムのサイズをキャッシュに加える"""
+        size = item.sizeHint()
+        minimum = item.minimumSize()
+        self._widths.insert(index, size.width())
+        self._heights.insert(index, size.height())
+        self._min_widths.insert(index, minimum.width())
+        self._min_heights.insert(index, minimum.height())
+        self._countSize(size.width(), size.height(), 1)
+        self._countMinimum(minimum.width(), minimum.height(), 1)
+
+    def _removeSize(self, index):
+        """削除したアイテムのサイズをキャッシュから取り除く"""
+        self._countSize(self._widths.pop(index), self._heights.pop(index), -1)
+        self._countMinimum(self._min_widths.pop(index), self._min_heights.pop(index), -1)
+
+    def _countSize(self, width, height, delta):
+        """サイズごとのアイテム数を増減"""
+        key = (width, height)
+        count = self._size_counts.get(key, 0) + delta
+        if count:
+            self._size_counts[key] = count
+        else:
+            del self._size_counts[key]
+
+    def _countMinimum(self, width, height, delta):
+        """最小サイズの幅・高さごとのアイテム数を増減し、最大値を更新"""
+        self._min_width = self._countValue(self._min_width_counts, width, delta, self._min_width)
+        self._min_height = self._countValue(self._min_height_counts, height, delta, self._min_height)
+
+    @staticmethod
+    def _countValue(counts, value, delta, maximum):
+        """値ごとの数を増減し、新しい最大値を返す
+        最大値を持つアイテムが無くなった場合だけ、アイテムではなく残っている値の種類から求め直す
+        """
+        count = counts.get(value, 0) + delta
+        if count:
+            counts[value] = count
+        else:
+            del counts[value]
+            if value == maximum:
+                return max(counts) if counts else 0
+        return max(maximum, value) if delta > 0 else maximum
+
+    def _refreshSizes(self):
+        """invalidate 後にアイテムのサイズを確認し、変わったものだけキャッシュを更新
+        QWidgetItem はウィジェットが updateGeometry するまでサイズを保持しているので、
+        再計測が発生するのは変更を通知したウィジェットだけになる
+        (どのアイテムが変わったかは Qt から通知されないため、キャッシュとの比較自体はアイテム数に比例する)
+        """
+        if not self._sizes_dirty:
+            return
+        self._sizes_dirty = False
+        
+        first = None
+        last = None
+        widths = self._widths
+        heights = self._heights
+        min_widths = self._min_widths
+        min_heights = self._min_heights
+        for index, item in enumerate(self._items):
+            # 最小サイズは sizeHint が変わらなくても変わることがあるので必ず読み直す
+            minimum = item.minimumSize()
+            min_width = minimum.width()
+            min_height = minimum.height()
+            if min_width != min_widths[index] or min_height != min_heights[index]:
+                self._countMinimum(min_widths[index], min_heights[index], -1)
+                self._countMinimum(min_width, min_height, 1)
+                min_widths[index] = min_width
+                min_heights[index] = min_height
+            
+            size = item.sizeHint()
+            width = size.width()
+            height = size.height()
+            if width != widths[index] or height != heights[index]:
+                self._countSize(widths[index], heights[index], -1)
+                self._countSize(width, height, 1)
+                widths[index] = width
+                heights[index] = height
+                if first is None:
+                    first = index
+                last = index
+        
+        if first is not None:
+            self._reflow(first, 0, last)
+
     def _do_layout(self, rect):
         """サイズによってアイテムを再配置
 
         Args:
             rect (QtCore.QRect): レイアウトサイズ
         """        
-        if not self._items:
+        geometry = self._geometryFor(rect.width())
+        # 同じ位置と幅に同じ配置結果を適用済みなら、挿入・削除で位置が変わったアイテムだけ動かす
+        applied_rect = self._applied_rect
+        if geometry is self._applied_geometry and rect.topLeft() == applied_rect.topLeft() and rect.width() == applied_rect.width():
+            start, stop = self._dirty_range
+        elif isinstance(geometry, _UniformFlowGeometry) and geometry.sameGrid(self._applied_geometry) and rect.topLeft() == applied_rect.topLeft() \
+                and geometry.count == self._applied_geometry.count:
+            # 幅が変わっても列数が同じならアイテムは動かない
+            start, stop = self._dirty_range
+        else:
+            start, stop = 0, len(self._items)
+        
+        left = rect.x()
+        top = rect.y()
+        items = self._items
+        if isinstance(geometry, _UniformFlowGeometry):
+            # 均一な格子: アイテムのサイズを参照せず、行と列から位置を求める
+            columns = geometry.columns
+            step_x = geometry.step_x
+            step_y = geometry.step_y
+            top += geometry.top
+            width = geometry.item_width
+            height = geometry.item_height
+            for index in range(start, stop):
+                row, column = divmod(index, columns)
+                items[index].setGeometry(QtCore.QRect(left + column * step_x, top + row * step_y, width, height))
+        else:
+            rects = geometry.rects
+            for index in range(start, stop):
+                x, y, width, height = rects[index]
+                items[index].setGeometry(QtCore.QRect(left + x, top + y, width, height))
+        
+        self._applied_rect = QtCore.QRect(rect)
+        self._applied_geometry = geometry
+        self._dirty_range = (0, 0)
+        return geometry.height
+
+class FlowView(_FlowArrangement, QtWidgets.QAbstractScrollArea):
+    """FlowLayout と同じ折り返しでアイテムを並べるビュー
+    アイテムの位置はサイズだけから計算し、表示領域と前後の余白に入るアイテムにだけウィジェットを割り当てて、スクロール時に再利用する
+    """
+    def __init__(self, parent=None):
+        super(FlowView, self).__init__(parent)
+        self._items             = []    # アイテムごとのデータ
+        self._widths            = array.array("i")
+        self._heights           = array.array("i")
+        self._spacing           = 5
+        self._vertical_spacing  = 5
+        self._item_size         = QtCore.QSize(32, 32)  # サイズを指定せずに追加したアイテムのサイズ
+        self._overscan          = 64    # 表示領域の上下でウィジェットを割り当てておく範囲
+        self._geometry          = None  # ビューポートの幅に対する配置結果
+        self._create_widget     = None
+        self._bind_widget       = None
+        self._visible_widgets   = {}    # インデックス: 表示中のウィジェット
+        self._widget_indexes    = {}    # 表示中のウィジェット: インデックス
+        self._pool              = []    # 再利用を待つウィジェット
+        
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(20)
+
+    # override method
+    def resizeEvent(self, event):
+        super(FlowView, self).resizeEvent(event)
+        if self._geometry is None or self._geometry.width != self.viewport().width():
+            self._relayout()
+
+    def scrollContentsBy(self, dx, dy):
+        """ビューポートのスクロールはせず、表示するアイテムを割り当て直す"""
+        self._updateVisibleItems()
+
+    # public method
+    def count(self):
+        return len(self._items)
+    
+    def item(self, index):
+        """アイテムのデータを返す"""
+        return self._items[index]
+    
+    def spacing(self):
+        """アイテムの水平の間隔
+
+        Returns:
+            int: 間隔
+        """
+        return self._spacing
+    
+    def verticalSpacing(self):
+        """アイテムの垂直の間隔
+
+        Returns:
+            int: 間隔
+        """
+        return self._vertical_spacing
+    
+    def itemSize(self):
+        """サイズを指定せずに追加したアイテムのサイズ
+
+        Returns:
+            QtCore.QSize: サイズ
+        """
+        return QtCore.QSize(self._item_size)
+    
+    def overscan(self):
+        """表示領域の上下でウィジェットを割り当てておく範囲
+
+        Returns:
+            int: 範囲 (ピクセル)
+        """
+        return self._overscan
+    
+    def widget(self, index):
+        """アイテムに割り当て中のウィジェットを返す (表示領域外の場合は None)"""
+        return self._visible_widgets.get(index)
+    
+    def indexOfWidget(self, widget):
+        """割り当て中のウィジェットのインデックスを返す (見つからない場合は -1)"""
+        return self._widget_indexes.get(widget, -1)
+    
+    def itemRect(self, index):
+        """アイテムのビューポート上の矩形を返す
+
+        Returns:
+            QtCore.QRect: アイテムの矩形
+        """
+        x, y, width, height = self._currentGeometry().rects[index]
+        return QtCore.QRect(x, y - self.verticalScrollBar().value(), width, height)
+    
+    def setSpacing(self, spacing):
+        """アイテムの水平の間隔を変更"""
+        self._spacing = spacing
+        self._relayout()
+    
+    def setVerticalSpacing(self, spacing):
+        """アイテムの垂直の間隔を変更"""
+        self._vertical_spacing = spacing
+        self._relayout()
+    
+    def setItemSize(self, size):
+        """サイズを指定せずに追加するアイテムのサイズを変更 (追加済みのアイテムには影響しない)"""
+        self._item_size = QtCore.QSize(size)
+    
+    def setOverscan(self, overscan):
+        """表示領域の上下でウィジェットを割り当てておく範囲を変更"""
+        self._overscan = max(0, overscan)
+        self._updateVisibleItems()
+    
+    def setWidgetFactory(self, create, bind=None):
+        """アイテムのウィジェットを生成・更新する関数を登録
+        create はウィジェットが足りなくなったときだけ呼ばれ、bind は割り当てるアイテムが変わるたびに呼ばれる
+
+        Args:
+            create (callable): QWidget を返す関数
+            bind (callable): (QWidget, アイテムのデータ) を受け取りウィジェットを更新する関数
+        """
+        self._create_widget = create
+        self._bind_widget = bind
+        self._releaseAll(destroy=True)
+        self._updateVisibleItems()
+    
+    def setItems(self, items, sizes=None):
+        """アイテムをまとめて設定
+
+        Args:
+            items (list): アイテムのデータ
+            sizes (list): アイテムごとの QtCore.QSize (省略時はすべて itemSize)
+        """
+        self._releaseAll()
+        self._items = list(items)
+        if sizes is None:
+            self._widths = array.array("i", [self._item_size.width()]) * len(self._items)
+            self._heights = array.array("i", [self._item_size.height()]) * len(self._items)
+        else:
+            self._widths = array.array("i", [size.width() for size in sizes])
+            self._heights = array.array("i", [size.height() for size in sizes])
+        self._relayout()
+    
+    def addItem(self, item, size=None):
+        """アイテムを末尾に追加"""
+        self.insertItem(len(self._items), item, size)
+    
+    def addItems(self, items, sizes=None):
+        """アイテムをまとめて末尾に追加 (配置は最後の行の続きから一度だけ行う)
+
+        Args:
+            items (iterable): アイテムのデータ
+            sizes (list): アイテムごとの QtCore.QSize (省略時はすべて itemSize)
+        """
+        start = len(self._items)
+        self._items.extend(items)
+        count = len(self._items) - start
+        if sizes is None:
+            self._widths.extend(array.array("i", [self._item_size.width()]) * count)
+            self._heights.extend(array.array("i", [self._item_size.height()]) * count)
+        else:
+            self._widths.extend(size.width() for size in sizes)
+            self._heights.extend(size.height() for size in sizes)
+        
+        geometry = self._geometry
+        if geometry is not None and geometry.row_starts:
+            self._flow(geometry, start, geometry.cursor, geometry.row_tops[-1], geometry.row_heights[-1], False)
+        else:
+            self._geometry = None
+        self._updateScrollBar()
+        self._updateVisibleItems()
+    
+    def insertItem(self, index, item, size=None):
+        """アイテムを挿入
+
+        Args:
+            index (int): 挿入する位置 (範囲外の場合は末尾)
+            item (object): アイテムのデータ
+            size (QtCore.QSize): アイテムのサイズ (省略時は itemSize)
+        """
+        if not 0 <= index < len(self._items):
+            index = len(self._items)
+        if size is None:
+            size = self._item_size
+        self._items.insert(index, item)
+        self._widths.insert(index, size.width())
+        self._heights.insert(index, size.height())
+        self._shiftWidgets(index, 1)
+        self._reflow(index, 1)
+    
+    def removeItem(self, index):
+        """アイテムを削除"""
+        if not 0 <= index < len(self._items):
             return
+        if index in self._visible_widgets:
+            self._releaseWidget(index)
+        self._items.pop(index)
+        self._widths.pop(index)
+        self._heights.pop(index)
+        self._shiftWidgets(index + 1, -1)
+        self._reflow(index, -1)
+    
+    def clear(self):
+        """すべてのアイテムを削除"""
+        self.setItems([])
+    
+    def scrollToItem(self, index):
+        """アイテムが表示されるようにスクロール"""
+        x, y, width, height = self._currentGeometry().rects[index]
+        scroll_bar = self.verticalScrollBar()
+        if y < scroll_bar.value():
+            scroll_bar.setValue(y)
+        elif y + height > scroll_bar.value() + self.viewport().height():
+            scroll_bar.setValue(y + height - self.viewport().height())
+    
+    # private method
+    def _currentGeometry(self):
+        if self._geometry is None:
+            self._geometry = self._computeGeometry(self.viewport().width())
+        return self._geometry
+    
+    def _updateScrollBar(self):
+        height = self.viewport().height()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setPageStep(height)
+        scroll_bar.setRange(0, max(0, self._currentGeometry().height - height))
+    
+    def _relayout(self):
+        """ビューポートの幅で配置を計算し直して表示を更新"""
+        self._geometry = None
+        self._updateScrollBar()
+        self._updateVisibleItems()
+    
+    def _reflow(self, index, delta):
+        """挿入・削除した位置から配置を部分的に更新して表示を更新"""
+        if self._geometry is not None:
+            self._reflowGeometry(self._geometry, index, delta, index if delta >= 0 else index - 1)
+        self._updateScrollBar()
+        self._updateVisibleItems()
+    
+    def _updateVisibleItems(self):
+        """表示領域と前後の余白に入るアイテムにだけウィジェットを割り当てる"""
+        geometry = self._currentGeometry()
+        scroll = self.verticalScrollBar().value()
+        top = scroll - self._overscan
+        bottom = scroll + self.viewport().height() + self._overscan
         
-        x = rect.x()
-        y = rect.y()
-        row_height = 0
-        for item in self._items:
-            widget = item.widget()
-            size = widget.sizeHint()
-            if x + size.width() > rect.right():
-                x = rect.x()
-                y += row_height + self._vertical_spacing
-                row_height = 0
-                
-            item.setGeometry(QtCore.QRect(QtCore.QPoint(x, y), size))
-            x += size.width() + self.spacing()
-            row_height = max(row_height, size.height())
-            
-        return y + row_height - rect.y()
+        # 行の位置から範囲内のアイテムを二分探索
+        start = stop = 0
+        if geometry.row_starts and self._create_widget is not None:
+            first_row = max(0, bisect.bisect_right(geometry.row_tops, top) - 1)
+            last_row = bisect.bisect_left(geometry.row_tops, bottom)
+            start = geometry.row_starts[first_row]
+            stop = geometry.row_starts[last_row] if last_row < len(geometry.row_starts) else len(self._items)
+        
+        # 範囲から外れたウィジェットをプールに戻す
+        for index in [index for index in self._visible_widgets if not start <= index < stop]:
+            self._releaseWidget(index)
+        
+        rects = geometry.rects
+        for index in range(start, stop):
+            widget = self._visible_widgets.get(index)
+            if widget is None:
+                widget = self._acquireWidget()
+                self._bindWidget(widget, index)
+            x, y, width, height = rects[index]
+            widget.setGeometry(x, y - scroll, width, height)
+            widget.show()
+    
+    def _acquireWidget(self):
+        """プールからウィジェットを取り出す (空の場合は生成)"""
+        if self._pool:
+            return self._pool.pop()
+        
+        widget = self._create_widget()
+        widget.setParent(self.viewport())
+        return widget
+    
+    def _bindWidget(self, widget, index):
+        """ウィジェットにアイテムの内容を反映"""
+        if self._bind_widget is not None:
+            self._bind_widget(widget, self._items[index])
+        self._visible_widgets[index] = widget
+        self._widget_indexes[widget] = index
+    
+    def _releaseWidget(self, index):
+        """ウィジェットを非表示にしてプールに戻す"""
+        widget = self._visible_widgets.pop(index)
+        self._widget_indexes.pop(widget, None)
+        widget.hide()
+        self._pool.append(widget)
+    
+    def _releaseAll(self, destroy=False):
+        """すべてのウィジェットをプールに戻す (destroy の場合は破棄)"""
+        for index in list(self._visible_widgets):
+            self._releaseWidget(index)
+        if destroy:
+            for widget in self._pool:
+                widget.deleteLater()
+            self._pool = []
+    
+    def _shiftWidgets(self, index, delta):
+        """挿入・削除に合わせて index 以降に割り当て中のウィジェットのインデックスをずらす"""
+        shifted = {}
+        for widget_index, widget in self._visible_widgets.items():
+            if widget_index >= index:
+                widget_index += delta
+            shifted[widget_index] = widget
+            self._widget_indexes[widget] = widget_index
+        self._visible_widgets = shifted
 
 # ----------------------------------------------------------------------------------
 # 数値スライダー
 # ----------------------------------------------------------------------------------
+class _ValueConsumer(QtCore.QObject):
+    """FloatSlider.setConsumer の関数をワーカーで実行する
+    実行中のタスクは 1 つまでとし、その間に届いた値は最新のものだけを残して次に実行する
+    """
+    kLatencySamples = 64    # 保持するタスクの所要時間の数
+    _shared_executor = None # 実行先を省略した場合のスレッドプール (全スライダーで共有)
+    _done = QtCore.Signal(object)   # ワーカーから GUI スレッドに完了した Future を渡す
+    
+    def __init__(self, slider, func, executor=None):
+        super(_ValueConsumer, self).__init__(slider)
+        self.slider     = slider
+        self.func       = func
+        self.executor   = executor or _ValueConsumer._sharedExecutor()
+        self.future     = None  # 実行中のタスク
+        self.task       = None  # 実行中のタスクの (値, 値を受け取った時刻)
+        self.pending    = None  # 次に実行する (値, 値を受け取った時刻)
+        self.dropped    = 0
+        self.latencies  = collections.deque(maxlen=self.kLatencySamples)
+        self._done.connect(self._onDone)
+    
+    @staticmethod
+    def _sharedExecutor():
+        if _ValueConsumer._shared_executor is None:
+            _ValueConsumer._shared_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="FloatSlider")
+            # 終了時に待ち中のタスクを捨ててワーカーを止める
+            app = QtCore.QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(_ValueConsumer._shutdownSharedExecutor)
+        return _ValueConsumer._shared_executor
+    
+    @staticmethod
+    def _shutdownSharedExecutor():
+        executor = _ValueConsumer._shared_executor
+        if executor is None:
+            return
+        _ValueConsumer._shared_executor = None
+        app = QtCore.QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.disconnect(_ValueConsumer._shutdownSharedExecutor)
+        try:
+            executor.shutdown(wait=False, cancel_futures=True)
+        except TypeError:
+            executor.shutdown(wait=False)   # Python 3.8 以前
+    
+    def depth(self):
+        """実行中と保留中の値の数 (最大 2)"""
+        return (self.future is not None) + (self.pending is not None)
+    
+    def dispatch(self, value):
+        """値を関数に渡す (実行中なら最新の値として保留)"""
+        received = time.perf_counter()
+        if self.future is None:
+            self._submit(value, received)
+            return
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (value, received)
+    
+    def cancel(self):
+        """保留中の値と実行中のタスクの結果を捨てる"""
+        self.func = None
+        self.future = None
+        self.pending = None
+    
+    def _submit(self, value, received):
+        future = self.executor.submit(self.func, value)
+        self.future = future
+        self.task = (value, received)
+        
+        done = self._done
+        def notify(future):
+            # ワーカー側のスレッドから呼ばれるのでシグナルで GUI スレッドに渡す
+            try:
+                done.emit(future)
+            except RuntimeError:
+                pass    # スライダーと一緒に破棄済み
+        future.add_done_callback(notify)
+    
+    def _onDone(self, future):
+        """タスクの完了 (GUI スレッド)。保留中の値があれば次のタスクを始めてから結果を送出する"""
+        if future is not self.future:
+            return  # cancel された後のタスク
+        value, received = self.task
+        self.future = None
+        self.task = None
+        if self.pending is not None:
+            pending = self.pending
+            self.pending = None
+            self._submit(*pending)
+        
+        if future.cancelled():
+            return
+        self.latencies.append((time.perf_counter() - received) * 1000.0)
+        error = future.exception()
+        if error is None:
+            self.slider.consumerFinished.emit(value, future.result())
+        else:
+            self.slider.consumerFailed.emit(value, error)
+
 class FloatSlider(QtWidgets.QWidget):
     sliderMoved = QtCore.Signal(float)
     sliderPressed = QtCore.Signal()
     sliderReleased = QtCore.Signal()
     valueChanged = QtCore.Signal(float)
+    consumerFinished = QtCore.Signal(float, object)     # (値, setConsumer の関数の戻り値)
+    consumerFailed = QtCore.Signal(float, object)       # (値, 例外)
+    
+    # sliderMoved の送出方法
+    kEmitEveryMove  = 0     # マウスが動くたびに送出
+    kEmitPerFrame   = 1     # 画面のリフレッシュごとに最新の値だけ送出
+    kEmitInterval   = 2     # 一定の間隔ごとに最新の値だけ送出
+    
+    kLayerCacheSize = 64    # 全スライダーで共有する描画済みレイヤーの数
+    kValueFont = QtGui.QFont('Lucida Sans Unicode', 10)
+    kPressedBackgroundColor = QtGui.QColor(34, 34, 34)
+    kHoveredBackgroundColor = QtGui.QColor(120, 120, 120)
+    _layer_cache = collections.OrderedDict()    # (種類, 幅, 高さ, DPR, 色...): QPixmap
+    _editor_pool = []   # 入力モードで貸し出す QLineEdit (全スライダーで共有)
     
     # override method
     def __init__(self, parent=None):
@@ -712,7 +3161,7 @@ class FloatSlider(QtWidgets.QWidget):
         self.setMinimumHeight(20)
         self.layout = QtWidgets.QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
-        self._set_line_edit()
+        self._line_edit = None  # 入力モードの間だけ共有のエディタを借りる
         
         self._value = 0.5
         self._maximum = 1.0
@@ -728,6 +3177,26 @@ class FloatSlider(QtWidgets.QWidget):
         self._pressed_button = QtCore.Qt.NoButton
         self._moved = False
         self._hovered = False
+        
+        self._value_text = StaticText(self.kValueFont, self.devicePixelRatioF())
+        self._value_text_key = None
+        self._value_string = ""
+        
+        # sliderMoved の送出方法
+        self._emit_policy = self.kEmitEveryMove
+        self._emit_interval = 16
+        self._emit_leading = False
+        self._emit_trailing = True
+        self._emit_timer = None
+        self._pending_value = None
+        self._delivered_count = 0
+        self._dropped_count = 0
+        self._consumer = None   # setConsumer の関数を実行する _ValueConsumer
+
+    def event(self, event):
+        if event.type() in StaticText.kDeviceEvents:
+            self._value_text.setFont(self.kValueFont, self.devicePixelRatioF())
+        return super(FloatSlider, self).event(event)
 
     def mousePressEvent(self, event):
         if event.button() == QtCore.Qt.LeftButton:
@@ -748,11 +3217,12 @@ class FloatSlider(QtWidgets.QWidget):
             if self._single_step > 0:
                 self._value = round(round(value / self._single_step) * self._single_step, self._decimals)
 
-            self.sliderMoved.emit(self._value)
+            self._emitMoved(self._value)
             self.update()
 
     def mouseReleaseEvent(self, event):
         if event.button() == QtCore.Qt.LeftButton:
+            self._flushMoved()
             self._pressed = False
             self._pressed_button = QtCore.Qt.NoButton
             # スライダーが動かなかった場合に入力切り替え
@@ -777,35 +3247,28 @@ class FloatSlider(QtWidgets.QWidget):
 
     def paintEvent(self, event):
         painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
-        painter.begin(self)
         rect = self.rect()
 
         # 背景
         if self._pressed:
-            painter.setBrush(QtGui.QColor(34, 34, 34))
+            background_color = self.kPressedBackgroundColor
         elif self._hovered:
-            painter.setBrush(QtGui.QColor(120, 120, 120))
+            background_color = self.kHoveredBackgroundColor
         else:
-            painter.setBrush(self._background_color)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawRoundedRect(QtCore.QRectF(0, 0, rect.width(), rect.height()), 4, 4)
-
-        # くり抜きようのパス
-        path = QtGui.QPainterPath()
-        path.addRoundedRect(QtCore.QRectF(0, 0, rect.width(), rect.height()), 4, 4)
-        painter.setClipPath(path)
+            background_color = self._background_color
+        painter.drawPixmap(0, 0, self._roundedPixmap(background_color))
 
-        # スライダー
-        painter.setBrush(self._color)
-        painter.setPen(QtCore.Qt.NoPen)
-        width = (self._value - self._minimum) / (self._maximum - self._minimum) * rect.width()
-        painter.drawRect(QtCore.QRect(0, 0, width, rect.height()))
+        # スライダー (角丸に塗った画像の左側だけを転送する)
+        width = int((self._value - self._minimum) / (self._maximum - self._minimum) * rect.width())
+        if width > 0:
+            bar = self._roundedPixmap(self._color)
+            dpr = bar.devicePixelRatio()
+            painter.drawPixmap(QtCore.QRectF(0, 0, width, rect.height()), bar, QtCore.QRectF(0, 0, width * dpr, rect.height() * dpr))
 
         # 数値
         painter.setPen(self._text_color)
-        painter.setFont(QtGui.QFont('Lucida Sans Unicode', 10))
-        painter.drawText(rect, QtCore.Qt.AlignCenter, "{:.{}f}".format(self._value, self._decimals))
+        painter.setFont(self.kValueFont)
+        self._value_text.draw(painter, rect, QtCore.Qt.AlignCenter, self._valueText())
 
         painter.end()
     
@@ -834,6 +3297,89 @@ class FloatSlider(QtWidgets.QWidget):
     def backgroundColor(self):
         return self._background_color
     
+    def emissionPolicy(self):
+        """sliderMoved の送出方法
+
+        Returns:
+            int: kEmitEveryMove = 0 kEmitPerFrame = 1 kEmitInterval = 2
+        """
+        return self._emit_policy
+    
+    def deliveredCount(self):
+        """送出した sliderMoved の数"""
+        return self._delivered_count
+    
+    def droppedCount(self):
+        """新しい値で置き換えられて送出しなかった sliderMoved の数"""
+        return self._dropped_count
+    
+    def consumer(self):
+        """setConsumer で設定した関数"""
+        return self._consumer.func if self._consumer is not None else None
+    
+    def consumerQueueDepth(self):
+        """setConsumer の関数に渡すのを待っている値の数 (実行中のタスクを含み、最大 2)"""
+        return self._consumer.depth() if self._consumer is not None else 0
+    
+    def consumerDroppedCount(self):
+        """新しい値で置き換えられて setConsumer の関数に渡さなかった値の数"""
+        return self._consumer.dropped if self._consumer is not None else 0
+    
+    def consumerLatencies(self):
+        """最近のタスクの所要時間 (値を受け取ってから結果が GUI スレッドに届くまで、ミリ秒)
+
+        Returns:
+            list: 古い順の所要時間 (最大 64 個)
+        """
+        return list(self._consumer.latencies) if self._consumer is not None else []
+    
+    def resetCounters(self):
+        self._delivered_count = 0
+        self._dropped_count = 0
+        if self._consumer is not None:
+            self._consumer.dropped = 0
+            self._consumer.latencies.clear()
+    
+    def setConsumer(self, func, executor=None):
+        """sliderMoved / valueChanged の値を受け取る関数を GUI スレッドの外で実行する
+        実行中のタスクは 1 つまでとし、その間に届いた値は最新のものだけを残して次に実行する
+        戻り値は GUI スレッドで consumerFinished (例外の場合は consumerFailed) として送出する
+
+        Args:
+            func (callable): 値を受け取る関数 (ProcessPoolExecutor の場合は pickle できる関数)。None で解除
+            executor (concurrent.futures.Executor): 実行先 (省略時は全スライダーで共有のスレッドプール)
+        """
+        if self._consumer is not None:
+            # 実行中のタスクの結果は捨てる
+            self.sliderMoved.disconnect(self._consumer.dispatch)
+            self.valueChanged.disconnect(self._consumer.dispatch)
+            self._consumer.cancel()
+            self._consumer.deleteLater()
+            self._consumer = None
+        
+        if func is not None:
+            self._consumer = _ValueConsumer(self, func, executor)
+            self.sliderMoved.connect(self._consumer.dispatch)
+            self.valueChanged.connect(self._consumer.dispatch)
+    
+    def setEmissionPolicy(self, policy, interval=16, leading=False, trailing=True):
+        """ドラッグ中の sliderMoved の送出方法を設定
+        kEmitEveryMove 以外では、間隔の間に届いた値のうち最新のものだけを送出し、リリース時には必ず送出する
+        valueChanged はこれまでどおりリリース時に送出する
+
+        Args:
+            policy (int): kEmitEveryMove = 0 kEmitPerFrame = 1 kEmitInterval = 2
+            interval (int): kEmitInterval の間隔 (ミリ秒)
+            leading (bool): 間隔の始めの値をすぐに送出する
+            trailing (bool): 間隔の終わりに最新の値を送出する
+        """
+        if policy in [self.kEmitEveryMove, self.kEmitPerFrame, self.kEmitInterval]:
+            self._flushMoved()
+            self._emit_policy = policy
+            self._emit_interval = max(1, interval)
+            self._emit_leading = leading
+            self._emit_trailing = trailing or not leading
+    
     def setValue(self, value):
         self._value = value
     
@@ -863,22 +3409,158 @@ class FloatSlider(QtWidgets.QWidget):
         self._background_color = color
         
     # private method
-    def _set_line_edit(self):
-        # 数値入力用の QLineEdit
-        self._line_edit = QtWidgets.QLineEdit(self)
-        self._line_edit.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
-        self._line_edit.setFont(QtGui.QFont('Lucida Sans Unicode', 10))
-        self._line_edit.setValidator(QtGui.QDoubleValidator())
-        self._line_edit.setVisible(False)
-        self._line_edit.setObjectName("sliderLineEdit")
-        self._line_edit.setStyleSheet("#sliderLineEdit {border: none; border-radius: 5px;}")
-        self._line_edit.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
-        self._line_edit.returnPressed.connect(self._apply_text_value)
-        self._line_edit.editingFinished.connect(self._apply_text_value)
-        self.layout.addWidget(self._line_edit)
+    def _layerPixmap(self, key, draw):
+        """ウィジェットのサイズ・DPR ごとに描画済みのレイヤーを返す (同じ見た目のスライダーで共有)
+
+        Args:
+            key (tuple): 色や状態などレイヤーを区別する値
+            draw (callable): (QPainter, 幅, 高さ) を受け取りレイヤーを描く関数
+
+        Returns:
+            QtGui.QPixmap: レイヤー
+        """
+        return FloatSlider._cachedLayer(self.width(), self.height(), self.devicePixelRatioF(), key, draw)
+    
+    @staticmethod
+    def _cachedLayer(width, height, dpr, key, draw):
+        """サイズ・DPR とキーごとに描画済みのレイヤーを返す (FloatSliderPanel の行とも共有)"""
+        key = (width, height, dpr) + key
+        cache = FloatSlider._layer_cache
+        pixmap = cache.get(key)
+        if pixmap is not None:
+            cache.move_to_end(key)
+            return pixmap
+        
+        pixmap = QtGui.QPixmap(int(math.ceil(width * dpr)), int(math.ceil(height * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        draw(painter, width, height)
+        painter.end()
+        
+        cache[key] = pixmap
+        if len(cache) > FloatSlider.kLayerCacheSize:
+            cache.popitem(last=False)
+        return pixmap
+    
+    def _roundedPixmap(self, color):
+        """角丸の矩形を塗ったレイヤー (背景とスライダーに使う)"""
+        return FloatSlider._roundedLayer(self.width(), self.height(), self.devicePixelRatioF(), color)
+    
+    @staticmethod
+    def _roundedLayer(width, height, dpr, color):
+        def draw(painter, width, height):
+            painter.setPen(QtCore.Qt.NoPen)
+            painter.setBrush(color)
+            painter.drawRoundedRect(QtCore.QRectF(0, 0, width, height), 4, 4)
+        return FloatSlider._cachedLayer(width, height, dpr, ("rounded", color.rgba()), draw)
+    
+    def _emitInterval(self):
+        """送出の間隔 (ミリ秒)"""
+        if self._emit_policy == self.kEmitPerFrame:
+            screen = self.screen() if hasattr(self, "screen") else None
+            rate = screen.refreshRate() if screen is not None else 0
+            return max(1, int(round(1000.0 / rate))) if rate > 0 else 16
+        return self._emit_interval
+    
+    def _deliverMoved(self, value):
+        self._delivered_count += 1
+        self.sliderMoved.emit(value)
+    
+    def _emitMoved(self, value):
+        """送出方法に従って sliderMoved を送出する (間隔の途中なら最新の値として保留)"""
+        if self._emit_policy == self.kEmitEveryMove:
+            self._deliverMoved(value)
+            return
+        
+        if self._emit_timer is None:
+            self._emit_timer = QtCore.QTimer(self)
+            self._emit_timer.setSingleShot(True)
+            self._emit_timer.timeout.connect(self._onEmitTimeout)
+        
+        if self._emit_timer.isActive():
+            if self._pending_value is not None:
+                self._dropped_count += 1
+            self._pending_value = value
+        else:
+            if self._emit_leading:
+                self._deliverMoved(value)
+            else:
+                self._pending_value = value
+            self._emit_timer.start(self._emitInterval())
+    
+    def _onEmitTimeout(self):
+        """間隔の終わりに保留中の値を送出し、続けて値が届くように次の間隔を始める"""
+        if self._pending_value is None:
+            return
+        value = self._pending_value
+        self._pending_value = None
+        if self._emit_trailing:
+            self._deliverMoved(value)
+            self._emit_timer.start(self._emitInterval())
+        else:
+            self._dropped_count += 1
+    
+    def _flushMoved(self):
+        """保留中の値があれば送出する (リリース時)"""
+        if self._emit_timer is not None:
+            self._emit_timer.stop()
+        if self._pending_value is not None:
+            value = self._pending_value
+            self._pending_value = None
+            self._deliverMoved(value)
+    
+    def _valueText(self):
+        """表示用の数値の文字列 (値か桁数が変わった時だけ作り直す)"""
+        key = (self._value, self._decimals)
+        if key != self._value_text_key:
+            self._value_string = "{:.{}f}".format(self._value, self._decimals)
+            self._value_text_key = key
+        return self._value_string
+
+    @staticmethod
+    def _borrowEditor(parent, apply):
+        """共有のエディタを借りる (使用中でプールが空の場合だけ生成)
+
+        Args:
+            parent (QtWidgets.QWidget): エディタを重ねるウィジェット
+            apply (callable): 入力の確定時に呼ぶ関数
+
+        Returns:
+            QtWidgets.QLineEdit: エディタ
+        """
+        pool = FloatSlider._editor_pool
+        if pool:
+            editor = pool.pop()
+        else:
+            # 数値入力用の QLineEdit
+            editor = QtWidgets.QLineEdit()
+            editor.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+            editor.setFont(FloatSlider.kValueFont)
+            editor.setValidator(QtGui.QDoubleValidator())
+            editor.setObjectName("sliderLineEdit")
+            editor.setStyleSheet("#sliderLineEdit {border: none; border-radius: 5px;}")
+            editor.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
+        editor.setParent(parent)
+        editor.returnPressed.connect(apply)
+        editor.editingFinished.connect(apply)
+        return editor
+    
+    @staticmethod
+    def _returnEditor(editor, apply):
+        """借りたエディタを非表示にしてプールに戻す (スライダーが破棄されても残るように親から外す)"""
+        editor.returnPressed.disconnect(apply)
+        editor.editingFinished.disconnect(apply)
+        editor.setVisible(False)
+        editor.setParent(None)
+        FloatSlider._editor_pool.append(editor)
 
     def _activate_edit_mode(self):
         """スライダーを入力モードに切り替え"""
+        if self._line_edit is None:
+            self._line_edit = self._borrowEditor(self, self._apply_text_value)
+            self.layout.addWidget(self._line_edit)
         self._line_edit.setText("{:.{}f}".format(self._value, self._decimals))
         self._line_edit.setVisible(True)
         self._line_edit.setFocus()
@@ -887,14 +3569,28 @@ class FloatSlider(QtWidgets.QWidget):
 
     def _apply_text_value(self):
         """入力値を適用しスライダーに戻す"""
-        value = float(self._line_edit.text())
+        editor = self._line_edit
+        if editor is None:
+            return
+        value = float(editor.text())
         self._value = round(max(self._minimum, min(self._maximum, value)), self._decimals)
-        self._line_edit.setVisible(False)
-        self.setFocus()
+        # フォーカスが外れて editingFinished が再び届く前にエディタを手放す
+        # (他のスライダーのエディタにフォーカスが移った場合は奪い返さない)
+        has_focus = editor.hasFocus()
+        self._line_edit = None
+        self.layout.removeWidget(editor)
+        self._returnEditor(editor, self._apply_text_value)
+        if has_focus:
+            self.setFocus()
         self.valueChanged.emit(self._value)
         self.update()
 
 class FloatSymbolSlider(FloatSlider):
+    kPressedBackgroundColor = QtGui.QColor(40, 40, 40)
+    kSymbolColor = QtGui.QColor(100, 100, 100)
+    kSymbolHoveredColor = QtGui.QColor(120, 120, 120)
+    kSymbolMovedColor = QtGui.QColor(34, 34, 34)
+    
     def __init__(self, parent=None):
         super(FloatSymbolSlider, self).__init__(parent)
         self._hovered_left_symbol = False
@@ -932,6 +3628,7 @@ class FloatSymbolSlider(FloatSlider):
         
     def mouseReleaseEvent(self, event):
         if event.button() == QtCore.Qt.LeftButton:
+            self._flushMoved()
             self._pressed = False
             self._pressed_button = QtCore.Qt.NoButton
             if not self._moved:
@@ -958,98 +3655,745 @@ class FloatSymbolSlider(FloatSlider):
         
     def paintEvent(self, event):        
         painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
-        painter.begin(self)
         rect = self.rect()
         
         # 背景
         if self._pressed:
-            painter.setBrush(QtGui.QColor(40, 40, 40))
+            background_color = self.kPressedBackgroundColor
         elif self._hovered_center:
-            painter.setBrush(QtGui.QColor(120, 120, 120))
+            background_color = self.kHoveredBackgroundColor
         else:
-            painter.setBrush(self._background_color)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawRoundedRect(QtCore.QRectF(0, 0, rect.width(), rect.height()), 4, 4)
-        
-        # くり抜きようのパス
-        path = QtGui.QPainterPath()
-        path.addRoundedRect(QtCore.QRectF(0, 0, rect.width(), rect.height()), 4, 4)
-        painter.setClipPath(path)
+            background_color = self._background_color
+        painter.drawPixmap(0, 0, self._roundedPixmap(background_color))
         
         if self._hovered:
-            # シンボル
-            painter.setPen(QtCore.Qt.NoPen)         
-             
+            # シンボルと矢印
             if self._moved:
-                painter.setBrush(QtGui.QColor(34, 34, 34))
-            elif self._hovered_left_symbol:
-                painter.setBrush(QtGui.QColor(120, 120, 120))
+                left_color = right_color = self.kSymbolMovedColor
             else:
-                painter.setBrush(QtGui.QColor(100, 100, 100))
-            painter.drawRect(QtCore.QRect(0, 0, 16, rect.height()))
+                left_color = self.kSymbolHoveredColor if self._hovered_left_symbol else self.kSymbolColor
+                right_color = self.kSymbolHoveredColor if self._hovered_right_symbol else self.kSymbolColor
+            painter.drawPixmap(0, 0, self._symbolPixmap(left_color, right_color))
+        
+        # 数値
+        painter.setPen(self._text_color)
+        painter.setFont(self.kValueFont)
+        self._value_text.draw(painter, rect, QtCore.Qt.AlignCenter, self._valueText())
+        
+        painter.end()
+    
+    def _symbolPixmap(self, left_color, right_color):
+        """左右のシンボルと矢印を描いたレイヤー"""
+        def draw(painter, width, height):
+            # くり抜きようのパス
+            path = QtGui.QPainterPath()
+            path.addRoundedRect(QtCore.QRectF(0, 0, width, height), 4, 4)
+            painter.setClipPath(path)
             
-            if self._moved:
-                painter.setBrush(QtGui.QColor(34, 34, 34))
-            elif self._hovered_right_symbol:
-                painter.setBrush(QtGui.QColor(120, 120, 120))
-            else:
-                painter.setBrush(QtGui.QColor(100, 100, 100))
-            painter.drawRect(QtCore.QRect(rect.width() - 16, 0, 16, rect.height()))
+            painter.setPen(QtCore.Qt.NoPen)
+            painter.setBrush(left_color)
+            painter.drawRect(QtCore.QRect(0, 0, 16, height))
+            painter.setBrush(right_color)
+            painter.drawRect(QtCore.QRect(width - 16, 0, 16, height))
             
             # 矢印
             path = QtGui.QPainterPath()
             # left arrow
-            center = QtCore.QPoint(8, rect.height() / 2)
+            center = QtCore.QPoint(8, height / 2)
             path.moveTo(center.x() + 2, center.y() - 3)
             path.lineTo(center.x() - 2, center.y())
             path.lineTo(center.x() + 2, center.y() + 3)
             
             # right arrow
-            center = QtCore.QPoint(rect.width() - 8, rect.height() / 2)
+            center = QtCore.QPoint(width - 8, height / 2)
             path.moveTo(center.x() - 2, center.y() - 3)
             path.lineTo(center.x() + 2, center.y())
             path.lineTo(center.x() - 2, center.y() + 3)
-        
+            
             pen = QtGui.QPen(QtGui.QColor(222, 222, 222))
             pen.setWidth(2)
             painter.setPen(pen)
             painter.setBrush(QtCore.Qt.NoBrush)
             painter.drawPath(path)
+        return self._layerPixmap(("symbols", left_color.rgba(), right_color.rgba()), draw)
+
+class FloatSliderBank(QtCore.QObject):
+    """多数の FloatSlider の値・範囲・ステップ・桁数を NumPy の配列でまとめて持つモデル
+    プリセットの適用などの一括操作はベクトル演算で行い、値が変わったインデックスだけを
+    valuesChanged で一度に通知する。bind したスライダーは値が変わった場合だけ再描画される
+    """
+    valuesChanged = QtCore.Signal(object)   # 値が変わったインデックス (numpy.ndarray)
+    
+    def __init__(self, count=0, parent=None):
+        super(FloatSliderBank, self).__init__(parent)
+        if np is None:
+            raise ImportError("FloatSliderBank requires numpy")
         
-        # 数値
+        # FloatSlider と同じ初期値
+        self._values    = np.full(count, 0.5)
+        self._minimums  = np.zeros(count)
+        self._maximums  = np.ones(count)
+        self._steps     = np.full(count, 0.001)
+        self._decimals  = np.full(count, 3, dtype=np.int32)
+        self._sliders   = {}    # インデックス: bind したスライダーのリスト
+        self._slider_indexes = {}   # bind したスライダー: インデックス
+        self._destroyed_slots = {}  # bind したスライダー: destroyed に接続した関数
+        self._updating  = False
+    
+    # public method
+    def count(self):
+        return len(self._values)
+    
+    def values(self, indices=None):
+        """値の配列を返す (書き換え不可のビュー、indices を指定した場合はコピー)"""
+        if indices is not None:
+            return self._values[self._indices(indices)]
+        view = self._values.view()
+        view.flags.writeable = False
+        return view
+    
+    def value(self, index):
+        return float(self._values[index])
+    
+    def minimums(self):
+        return self._minimums.copy()
+    
+    def maximums(self):
+        return self._maximums.copy()
+    
+    def singleSteps(self):
+        return self._steps.copy()
+    
+    def decimals(self):
+        return self._decimals.copy()
+    
+    def resize(self, count):
+        """スライダーの数を変更 (増えた分は FloatSlider の初期値)"""
+        old_count = len(self._values)
+        if count < old_count:
+            for index in [index for index in self._sliders if index >= count]:
+                for slider in list(self._sliders[index]):
+                    self.unbind(slider)
+            self._values = self._values[:count].copy()
+            self._minimums = self._minimums[:count].copy()
+            self._maximums = self._maximums[:count].copy()
+            self._steps = self._steps[:count].copy()
+            self._decimals = self._decimals[:count].copy()
+        elif count > old_count:
+            added = count - old_count
+            self._values = np.concatenate([self._values, np.full(added, 0.5)])
+            self._minimums = np.concatenate([self._minimums, np.zeros(added)])
+            self._maximums = np.concatenate([self._maximums, np.ones(added)])
+            self._steps = np.concatenate([self._steps, np.full(added, 0.001)])
+            self._decimals = np.concatenate([self._decimals, np.full(added, 3, dtype=np.int32)])
+    
+    def bind(self, slider, index):
+        """スライダーを index 番目の値に結びつける
+        スライダーに範囲・ステップ・桁数・値を反映し、ドラッグや入力での変更をモデルに書き戻す
+        """
+        self.unbind(slider)
+        self._sliders.setdefault(index, []).append(slider)
+        self._slider_indexes[slider] = index
+        self._pushSettings(slider, index)
+        slider.setValue(float(self._values[index]))
+        slider.update()
+        slider.sliderMoved.connect(self._onSliderChanged)
+        slider.valueChanged.connect(self._onSliderChanged)
+        # destroyed の引数は元のスライダーと同一のオブジェクトにならないので、スライダーを束縛しておく
+        slot = self._destroyed_slots[slider] = lambda obj=None, slider=slider: self._onSliderDestroyed(slider)
+        slider.destroyed.connect(slot)
+    
+    def unbind(self, slider):
+        """スライダーの結びつけを解除"""
+        if self._forget(slider):
+            slider.sliderMoved.disconnect(self._onSliderChanged)
+            slider.valueChanged.disconnect(self._onSliderChanged)
+            slider.destroyed.disconnect(self._destroyed_slots.pop(slider))
+    
+    def setValue(self, index, value):
+        self.setValues(value, [index])
+    
+    def setValues(self, values, indices=None):
+        """値をまとめて設定 (スカラーの場合はすべて同じ値)
+
+        Args:
+            values (float or array-like): 値
+            indices (array-like): 対象のインデックス (省略時はすべて)
+        """
+        indices = self._indices(indices)
+        self._commit(indices, np.broadcast_to(np.asarray(values, dtype=float), indices.shape))
+    
+    def scale(self, factor, indices=None):
+        """値に係数を掛ける"""
+        indices = self._indices(indices)
+        self._commit(indices, self._values[indices] * factor)
+    
+    def clamp(self, indices=None):
+        """値をそれぞれの範囲に収める"""
+        indices = self._indices(indices)
+        self._commit(indices, np.clip(self._values[indices], self._minimums[indices], self._maximums[indices]))
+    
+    def quantize(self, indices=None):
+        """値を singleStep の倍数に丸め、decimals の桁数に丸める (FloatSlider のドラッグ時と同じ)"""
+        indices = self._indices(indices)
+        values = self._values[indices]
+        steps = self._steps[indices]
+        has_step = steps > 0
+        values = np.where(has_step, np.round(values / np.where(has_step, steps, 1.0)) * steps, values)
+        scale = 10.0 ** self._decimals[indices]
+        self._commit(indices, np.round(values * scale) / scale)
+    
+    def normalize(self, indices=None):
+        """値の合計が 1 になるように揃える (合計が 0 の場合は均等に配分)"""
+        indices = self._indices(indices)
+        if not len(indices):
+            return
+        values = self._values[indices]
+        total = values.sum()
+        if total:
+            self._commit(indices, values / total)
+        else:
+            self._commit(indices, np.full(len(indices), 1.0 / len(indices)))
+    
+    def setRange(self, minimums, maximums, indices=None):
+        indices = self._indices(indices)
+        self._minimums[indices] = minimums
+        self._maximums[indices] = maximums
+        self._pushAllSettings(indices)
+    
+    def setSingleStep(self, steps, indices=None):
+        indices = self._indices(indices)
+        self._steps[indices] = steps
+        self._pushAllSettings(indices)
+    
+    def setDecimals(self, decimals, indices=None):
+        indices = self._indices(indices)
+        self._decimals[indices] = decimals
+        self._pushAllSettings(indices)
+    
+    # private method
+    def _indices(self, indices):
+        if indices is None:
+            return np.arange(len(self._values))
+        return np.asarray(indices, dtype=np.intp).reshape(-1)
+    
+    def _commit(self, indices, values):
+        """値を書き込み、変わったものだけスライダーに反映して通知"""
+        changed = self._values[indices] != values
+        if not changed.any():
+            return
+        indices = indices[changed]
+        self._values[indices] = values[changed]
+        
+        if self._sliders:
+            self._updating = True
+            try:
+                for index in indices.tolist():
+                    for slider in self._sliders.get(index, ()):
+                        slider.setValue(float(self._values[index]))
+                        slider.update()
+            finally:
+                self._updating = False
+        self.valuesChanged.emit(indices)
+    
+    def _pushSettings(self, slider, index):
+        slider.setRange(float(self._minimums[index]), float(self._maximums[index]))
+        slider.setSingleStep(float(self._steps[index]))
+        slider.setDecimals(int(self._decimals[index]))
+    
+    def _pushAllSettings(self, indices):
+        for index in indices.tolist():
+            for slider in self._sliders.get(index, ()):
+                self._pushSettings(slider, index)
+                slider.update()
+    
+    def _forget(self, slider):
+        """スライダーを管理から外す (bind されていなければ False)"""
+        index = self._slider_indexes.pop(slider, None)
+        if index is None:
+            return False
+        sliders = self._sliders[index]
+        sliders.remove(slider)
+        if not sliders:
+            del self._sliders[index]
+        return True
+    
+    def _onSliderChanged(self, value):
+        """スライダーの操作で変わった値をモデルに書き戻す"""
+        if self._updating:
+            return
+        index = self._slider_indexes.get(self.sender())
+        if index is not None:
+            self._commit(np.array([index], dtype=np.intp), np.array([value], dtype=float))
+    
+    def _onSliderDestroyed(self, slider):
+        self._forget(slider)
+        self._destroyed_slots.pop(slider, None)
+
+class FloatSliderPanel(QtWidgets.QAbstractScrollArea):
+    """FloatSlider と同じ見た目・操作のスライダーを行として並べて描画するパネル
+    行ごとのウィジェットは持たず、表示領域内の行だけを描画する。入力用の QLineEdit は 1 つを使い回す
+    """
+    sliderMoved = QtCore.Signal(int, float)     # (行, 値)
+    sliderPressed = QtCore.Signal(int)
+    sliderReleased = QtCore.Signal(int)
+    valueChanged = QtCore.Signal(int, float)    # (行, 値)
+    
+    kValueFont = FloatSlider.kValueFont
+    kPressedBackgroundColor = FloatSlider.kPressedBackgroundColor
+    kHoveredBackgroundColor = FloatSlider.kHoveredBackgroundColor
+    
+    def __init__(self, parent=None):
+        super(FloatSliderPanel, self).__init__(parent)
+        # 行ごとの設定 (FloatSlider と同じ既定値)
+        self._labels    = []
+        self._values    = array.array('d')
+        self._minimums  = array.array('d')
+        self._maximums  = array.array('d')
+        self._steps     = array.array('d')
+        self._decimals  = array.array('i')
+        
+        self._row_height    = 20
+        self._spacing       = 2
+        self._label_width   = 80
+        
+        self._color = QtGui.QColor(71, 114, 179)
+        self._text_color = QtGui.QColor(230, 230, 230)
+        self._background_color = QtGui.QColor(84, 84, 84)
+        
+        self._pressed_row   = -1
+        self._hovered_row   = -1
+        self._moved         = False
+        self._edit_row      = -1
+        self._line_edit     = None
+        self._texts         = {}    # 表示中の行: (ラベルの StaticText, 数値の StaticText)
+        
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.viewport().setMouseTracking(True)
+        self._updateScrollBar()
+
+    # override method
+    def resizeEvent(self, event):
+        super(FloatSliderPanel, self).resizeEvent(event)
+        self._updateScrollBar()
+        self._updateEditor()
+
+    def scrollContentsBy(self, dx, dy):
+        """行の位置だけが変わるので、入力中のエディタを動かして描画し直す"""
+        self._updateEditor()
+        self.viewport().update()
+
+    def event(self, event):
+        if event.type() in StaticText.kDeviceEvents:
+            # 行のテキストは描画時に現在のフォントと DPR で作り直す
+            self._texts = {}
+        return super(FloatSliderPanel, self).event(event)
+
+    def mousePressEvent(self, event):
+        if event.button() != QtCore.Qt.LeftButton:
+            return
+        row = self._barRowAt(event.pos())
+        if row < 0:
+            return
+        self._pressed_row = row
+        self._moved = False
+        self.sliderPressed.emit(row)
+        self._updateRow(row)
+
+    def mouseMoveEvent(self, event):
+        row = self._pressed_row
+        if row < 0:
+            self._setHoveredRow(self._barRowAt(event.pos()))
+            return
+        
+        self._moved = True
+        self.setCursor(QtCore.Qt.BlankCursor)
+        bar_width = self._barWidth()
+        minimum = self._minimums[row]
+        pos = max(0, min(bar_width, event.x() - self._label_width))
+        value = minimum + (float(pos) / float(max(1, bar_width))) * (self._maximums[row] - minimum)
+        step = self._steps[row]
+        if step > 0:
+            value = round(round(value / step) * step, self._decimals[row])
+        self._values[row] = value
+        self.sliderMoved.emit(row, value)
+        self._updateRow(row)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != QtCore.Qt.LeftButton or self._pressed_row < 0:
+            return
+        row = self._pressed_row
+        self._pressed_row = -1
+        # スライダーが動かなかった場合に入力切り替え
+        if not self._moved:
+            self._activateEditMode(row)
+        else:
+            self.valueChanged.emit(row, self._values[row])
+        self._moved = False
+        self.unsetCursor()
+        self.sliderReleased.emit(row)
+        self._updateRow(row)
+
+    def leaveEvent(self, event):
+        self._setHoveredRow(-1)
+        super(FloatSliderPanel, self).leaveEvent(event)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self.viewport())
+        painter.setFont(self.kValueFont)
         painter.setPen(self._text_color)
-        painter.setFont(QtGui.QFont('Lucida Sans Unicode', 10))
-        painter.drawText(rect, QtCore.Qt.AlignCenter, "{:.{}f}".format(self._value, self._decimals))
         
+        first, last = self._visibleRows()
+        exposed = event.rect()
+        bar_width = self._barWidth()
+        height = self._row_height
+        dpr = self.viewport().devicePixelRatioF()
+        texts = {}
+        for row in range(first, last):
+            rect = self.rowRect(row)
+            if not rect.intersects(exposed):
+                continue
+            label_text, value_text = texts[row] = self._texts.get(row) or (StaticText(self.kValueFont, dpr), StaticText(self.kValueFont, dpr))
+            
+            # ラベル
+            if self._label_width > 0:
+                label_rect = QtCore.QRect(4, rect.y(), self._label_width - 8, height)
+                label_text.draw(painter, label_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, self._labels[row])
+            if bar_width <= 0:
+                continue
+            
+            # 背景
+            if row == self._pressed_row:
+                background_color = self.kPressedBackgroundColor
+            elif row == self._hovered_row:
+                background_color = self.kHoveredBackgroundColor
+            else:
+                background_color = self._background_color
+            painter.drawPixmap(self._label_width, rect.y(), FloatSlider._roundedLayer(bar_width, height, dpr, background_color))
+            
+            # スライダー (角丸に塗った画像の左側だけを転送する)
+            value = self._values[row]
+            minimum = self._minimums[row]
+            span = self._maximums[row] - minimum
+            width = int((value - minimum) / span * bar_width) if span else 0
+            if width > 0:
+                bar = FloatSlider._roundedLayer(bar_width, height, dpr, self._color)
+                painter.drawPixmap(QtCore.QRectF(self._label_width, rect.y(), width, height), bar, QtCore.QRectF(0, 0, width * dpr, height * dpr))
+            
+            # 数値 (入力中の行はエディタが覆う)
+            if row != self._edit_row:
+                bar_rect = QtCore.QRect(self._label_width, rect.y(), bar_width, height)
+                value_text.draw(painter, bar_rect, QtCore.Qt.AlignCenter, "{:.{}f}".format(value, self._decimals[row]))
+        
+        # 描画しなかった行のテキストは捨てる (保持する数は表示領域の行数まで)
+        self._texts = texts
         painter.end()
+    
+    # public method
+    def count(self):
+        return len(self._labels)
+    
+    def label(self, row):
+        return self._labels[row]
+    
+    def value(self, row):
+        return self._values[row]
+    
+    def maximum(self, row):
+        return self._maximums[row]
+    
+    def minimum(self, row):
+        return self._minimums[row]
+    
+    def singleStep(self, row):
+        return self._steps[row]
+    
+    def decimals(self, row):
+        return self._decimals[row]
+    
+    def rowHeight(self):
+        return self._row_height
+    
+    def spacing(self):
+        return self._spacing
+    
+    def labelWidth(self):
+        return self._label_width
+    
+    def color(self):
+        return self._color
+    
+    def textColor(self):
+        return self._text_color
+    
+    def backgroundColor(self):
+        return self._background_color
+    
+    def rowAt(self, pos):
+        """ビューポート上の位置にある行を返す
+
+        Args:
+            pos (QtCore.QPoint): ビューポート上の位置
+
+        Returns:
+            int: 行 (行間や範囲外は -1)
+        """
+        pitch = self._row_height + self._spacing
+        y = pos.y() + self.verticalScrollBar().value()
+        row = y // pitch
+        if y < 0 or row >= len(self._labels) or y - row * pitch >= self._row_height:
+            return -1
+        return row
+    
+    def rowRect(self, row):
+        """行のビューポート上の矩形を返す
+
+        Returns:
+            QtCore.QRect: ラベルとスライダーを合わせた矩形
+        """
+        top = row * (self._row_height + self._spacing) - self.verticalScrollBar().value()
+        return QtCore.QRect(0, top, self.viewport().width(), self._row_height)
+    
+    def addSlider(self, label="", value=0.5, minimum=0.0, maximum=1.0, step=0.001, decimals=3):
+        """スライダーの行を追加
+
+        Returns:
+            int: 追加した行
+        """
+        self._labels.append(label)
+        self._values.append(value)
+        self._minimums.append(minimum)
+        self._maximums.append(maximum)
+        self._steps.append(step)
+        self._decimals.append(decimals)
+        self._updateScrollBar()
+        row = len(self._labels) - 1
+        self._updateRow(row)
+        return row
+    
+    def removeSlider(self, row):
+        """スライダーの行を削除 (以降の行は詰める)"""
+        self._finishEdit()
+        self._pressed_row = -1
+        self._hovered_row = -1
+        for rows in [self._labels, self._values, self._minimums, self._maximums, self._steps, self._decimals]:
+            del rows[row]
+        self._texts = {}
+        self._updateScrollBar()
+        self.viewport().update()
+    
+    def clear(self):
+        self._finishEdit()
+        self._pressed_row = -1
+        self._hovered_row = -1
+        for rows in [self._labels, self._values, self._minimums, self._maximums, self._steps, self._decimals]:
+            del rows[:]
+        self._texts = {}
+        self._updateScrollBar()
+        self.viewport().update()
+    
+    def setLabel(self, row, label):
+        self._labels[row] = label
+        self._updateRow(row)
+    
+    def setValue(self, row, value):
+        self._values[row] = value
+        self._updateRow(row)
+    
+    def setMaximum(self, row, value):
+        self._maximums[row] = value
+        self._updateRow(row)
+    
+    def setMinimum(self, row, value):
+        self._minimums[row] = value
+        self._updateRow(row)
+    
+    def setRange(self, row, min_value, max_value):
+        self._minimums[row] = min_value
+        self._maximums[row] = max_value
+        self._updateRow(row)
+    
+    def setSingleStep(self, row, step):
+        self._steps[row] = step
+    
+    def setDecimals(self, row, decimals):
+        self._decimals[row] = decimals
+        self._updateRow(row)
+    
+    def setRowHeight(self, height):
+        self._row_height = max(1, height)
+        self._relayout()
+    
+    def setSpacing(self, spacing):
+        self._spacing = max(0, spacing)
+        self._relayout()
+    
+    def setLabelWidth(self, width):
+        """ラベルの幅を変更 (0 の場合はラベルを描画しない)"""
+        self._label_width = max(0, width)
+        self._relayout()
+    
+    def setColor(self, color):
+        self._color = color
+        self.viewport().update()
+    
+    def setTextColor(self, color):
+        self._text_color = color
+        self.viewport().update()
+    
+    def setBackgroundColor(self, color):
+        self._background_color = color
+        self.viewport().update()
+    
+    def scrollToRow(self, row):
+        """行が表示されるようにスクロール"""
+        rect = self.rowRect(row)
+        scroll_bar = self.verticalScrollBar()
+        if rect.top() < 0:
+            scroll_bar.setValue(scroll_bar.value() + rect.top())
+        elif rect.bottom() >= self.viewport().height():
+            scroll_bar.setValue(scroll_bar.value() + rect.bottom() + 1 - self.viewport().height())
+    
+    # private method
+    def _barWidth(self):
+        return self.viewport().width() - self._label_width
+    
+    def _barRowAt(self, pos):
+        """スライダー部分 (ラベルの右側) にある行を返す"""
+        if pos.x() < self._label_width:
+            return -1
+        return self.rowAt(pos)
+    
+    def _visibleRows(self):
+        """表示領域にかかる行の範囲 (first, last + 1)"""
+        pitch = self._row_height + self._spacing
+        top = self.verticalScrollBar().value()
+        first = top // pitch
+        last = (top + self.viewport().height() + pitch - 1) // pitch
+        return first, min(last, len(self._labels))
+    
+    def _updateRow(self, row):
+        if 0 <= row < len(self._labels):
+            self.viewport().update(self.rowRect(row))
+    
+    def _setHoveredRow(self, row):
+        if row != self._hovered_row:
+            self._updateRow(self._hovered_row)
+            self._hovered_row = row
+            self._updateRow(row)
+    
+    def _updateScrollBar(self):
+        pitch = self._row_height + self._spacing
+        total = max(0, len(self._labels) * pitch - self._spacing)
+        height = self.viewport().height()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setSingleStep(pitch)
+        scroll_bar.setPageStep(height)
+        scroll_bar.setRange(0, max(0, total - height))
+    
+    def _relayout(self):
+        self._texts = {}
+        self._updateScrollBar()
+        self._updateEditor()
+        self.viewport().update()
+    
+    def _updateEditor(self):
+        """入力中のエディタを行のスライダー部分に合わせる"""
+        if self._edit_row >= 0:
+            rect = self.rowRect(self._edit_row)
+            self._line_edit.setGeometry(self._label_width, rect.y(), self._barWidth(), rect.height())
+    
+    def _activateEditMode(self, row):
+        """行を入力モードに切り替え (エディタは FloatSlider と共有のプールから借りる)"""
+        self._finishEdit()
+        self._line_edit = FloatSlider._borrowEditor(self.viewport(), self._applyTextValue)
+        self._edit_row = row
+        self._updateEditor()
+        self._line_edit.setText("{:.{}f}".format(self._values[row], self._decimals[row]))
+        self._line_edit.setVisible(True)
+        self._line_edit.setFocus()
+        self._line_edit.selectAll()
+        self._updateRow(row)
+    
+    def _applyTextValue(self):
+        """入力値を適用しスライダーに戻す"""
+        row = self._edit_row
+        if row < 0:
+            return
+        value = float(self._line_edit.text())
+        self._values[row] = round(max(self._minimums[row], min(self._maximums[row], value)), self._decimals[row])
+        has_focus = self._line_edit.hasFocus()
+        self._finishEdit()
+        if has_focus:
+            self.viewport().setFocus()
+        self.valueChanged.emit(row, self._values[row])
+    
+    def _finishEdit(self):
+        """入力モードを終了してエディタを返す (値は適用しない)"""
+        if self._edit_row >= 0:
+            row = self._edit_row
+            editor = self._line_edit
+            self._edit_row = -1
+            self._line_edit = None
+            FloatSlider._returnEditor(editor, self._applyTextValue)
+            self._updateRow(row)
 
 # ----------------------------------------------------------------------------------
 # シェルフ
 # ----------------------------------------------------------------------------------
+def shelf_button_args(button):
+    """shelf_tab_items 形式のボタンのデータを ShelfButton の引数に変換
+
+    Args:
+        button (dict): ボタンのデータ
+
+    Returns:
+        dict: ShelfButton / ShelfButton.setButton のキーワード引数
+    """
+    return {
+        "c": button["command"],
+        "dcc": button["doubleClickCommand"],
+        "i": button["iconName"],
+        "ann": button["toolTips"],
+        "iol": button["iconLabel"],
+        "olc": button["iconLabelColor"],
+        "olb": [*button["labelBackground"], button["backgroundTransparency"]],
+    }
+
 class ShelfButton(QtWidgets.QPushButton):
     def __init__(self, parent=None, c=None, dcc=None, i=None, ann=None, iol=None, olc=None, olb=None):
         super(ShelfButton, self).__init__(parent)
-        self._command = c
-        self._doubleClickCommand = dcc
-        self._icon = i
-        self._annotation = ann
-        self._iconLabel = iol
-        self._iconLabelColor = olc
-        self._labelBackground = olb
         self._clicked = False
         
         self.setFixedSize(QtCore.QSize(32, 32))
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.setIconSize(QtCore.QSize(32, 32))
-        self.setToolTip(self._annotation)
         self.setStyleSheet("QPushButton{border-style:none;}")
         
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.contextMenu)
         self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
-        rect = self.rect()
+        self.clicked.connect(self.click_command)
+        self.setButton(c, dcc, i, ann, iol, olc, olb)
+        
+    def setButton(self, c=None, dcc=None, i=None, ann=None, iol=None, olc=None, olb=None):
+        """ボタンの内容を設定 (FlowView で再利用するときにも呼ばれる)"""
+        self._command = c
+        self._doubleClickCommand = dcc
+        self._icon = i
+        self._annotation = ann
+        self._iconLabel = iol
+        self._iconLabelColor = olc
+        self._labelBackground = olb
+        self.setToolTip(self._annotation)
+        
+        if self._icon is None:
+            self._icon_normal = QtGui.QIcon()
+            self._icon_over = QtGui.QIcon()
+            self.setIcon(self._icon_normal)
+            return
         
+        rect = self.rect()
         # pixmap = self.prepare_icon(self._icon, 32)
         pixmap = QtGui.QPixmap(self._icon)
         if self._iconLabel:
@@ -1083,7 +4427,6 @@ class ShelfButton(QtWidgets.QPushButton):
         
         self._icon_over = QtGui.QIcon(pixmap)
         self.setIcon(self._icon_normal)
-        self.clicked.connect(self.click_command)
         
     def contextMenu(self, point):
         menu = QtWidgets.QMenu(self)
@@ -1125,6 +4468,11 @@ class ShelfButton(QtWidgets.QPushButton):
         
     def removeButton(self):
         layout = self.parent().layout()
+        if layout is None:
+            # FlowView のビューポート上のボタン
+            view = self.parent().parent()
+            view.removeItem(view.indexOfWidget(self))
+            return
         index = layout.indexOf(self)
         layout.takeAt(index)
  
@@ -1189,16 +4537,36 @@ class ShelfTabLayout(QtWidgets.QWidget):
         menu.exec_(self.mapToGlobal(point))
 
     def addButton(self, button):
-        shelf_button = ShelfButton(
-                    c=button["command"],
-                    dcc=button["doubleClickCommand"],
-                    i=button["iconName"],
-                    ann=button["toolTips"],
-                    iol=button["iconLabel"],
-                    olc=button["iconLabelColor"],
-                    olb=[*button["labelBackground"], button["backgroundTransparency"]])
+        shelf_button = ShelfButton(**shelf_button_args(button))
         self.flowLayout.addWidget(shelf_button)
 
+    def addButtons(self, buttons):
+        """ボタンをまとめて追加 (配置と描画は最後に一度だけ行う)
+
+        Args:
+            buttons (iterable): shelf_tab_items と同じ形式のボタンのデータ
+        """
+        with self.batchUpdate():
+            for button in buttons:
+                self.addButton(button)
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """with ブロックの間はシェルフの配置と描画を止める
+
+        with tab.batchUpdate():
+            tab.flowLayout.addWidget(ShelfButton(...))
+        """
+        suspend = self.updatesEnabled()
+        if suspend:
+            self.setUpdatesEnabled(False)
+        try:
+            with self.flowLayout.batchUpdate():
+                yield self
+        finally:
+            if suspend:
+                self.setUpdatesEnabled(True)
+
     def openAddButton(self):
         button = {
                 "command": "SmoothBindSkin",
@@ -1220,6 +4588,34 @@ class ShelfTabLayout(QtWidgets.QWidget):
     def item(self, index):
         return self.flowLayout.itemAt(index)    
     
+class ShelfFlowView(FlowView):
+    """ShelfTabLayout と同じ並びでボタンを表示する仮想化版
+    表示領域に入るボタンにだけ ShelfButton を割り当てるため、ボタンの数が多いシェルフでも生成時間とメモリが増えない
+    """
+    def __init__(self, parent=None):
+        super(ShelfFlowView, self).__init__(parent)
+        self.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.setWidgetFactory(ShelfButton, self._bindButton)
+    
+    def addButton(self, button):
+        """ボタンを追加
+
+        Args:
+            button (dict): shelf_tab_items と同じ形式のボタンのデータ
+        """
+        self.addItem(button)
+    
+    def addButtons(self, buttons):
+        """ボタンをまとめて追加
+
+        Args:
+            buttons (iterable): shelf_tab_items と同じ形式のボタンのデータ
+        """
+        self.addItems(buttons)
+    
+    def _bindButton(self, shelf_button, button):
+        shelf_button.setButton(**shelf_button_args(button))
+    
 class ShelfTab(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super(ShelfTab, self).__init__(parent)
@@ -1251,6 +4647,10 @@ class ShelfTab(QtWidgets.QWidget):
         tab = self._tabs[index]
         tab.addButton(shelfButton)
 
+    def addButtons(self, index, buttons):
+        tab = self._tabs[index]
+        tab.addButtons(buttons)
+
     def indexOf(self, widget):
         return self.tabWidget.indexOf(widget)
 